@@ -11,16 +11,20 @@ static constexpr char kMasterServerEndpoint[] =
 static constexpr char kMasterServerHost[] = "127.0.0.1";
 static constexpr int kMasterServerPort = 8000;
 
+// Bounds for the announce interval recommended by the master server, matching its
+// HEARTBEAT_MIN_INTERVAL/HEARTBEAT_MAX_INTERVAL
+static constexpr int kMinAnnounceIntervalSeconds = 15;
+static constexpr int kMaxAnnounceIntervalSeconds = 120;
+
 ServerListSystem::ServerListSystem(gsl::not_null<World*> apWorld)
     : m_pWorld(apWorld)
-    , m_nextAnnounce{}
 {
     m_updateSystem = apWorld->system("Server list Update").kind(flecs::OnUpdate).run([this](flecs::iter& iter) { Tick(); });
 
     m_serverListObserver = apWorld->observer<PlayerComponent>("Server list player Observer")
                                .event(flecs::OnSet)
                                .event(flecs::OnRemove)
-                               .each([this](flecs::iter& it, size_t i, PlayerComponent& component) { m_nextAnnounce = {}; });
+                               .each([this](flecs::iter& it, size_t i, PlayerComponent& component) { m_announceRequested = true; });
 
     m_updateSystem.child_of(apWorld->entity("systems"));
     m_serverListObserver.child_of(apWorld->entity("observers"));
@@ -28,11 +32,17 @@ ServerListSystem::ServerListSystem(gsl::not_null<World*> apWorld)
 
 void ServerListSystem::Tick() noexcept
 {
-    if (m_nextAnnounce < std::chrono::steady_clock::now())
+    // One announce at a time, the next one is scheduled once the master has answered
+    if (m_announceInFlight)
+        return;
+
+    const auto now = std::chrono::steady_clock::now().time_since_epoch().count();
+    if (m_announceRequested || m_nextAnnounce <= now)
     {
-        Announce();
+        m_announceRequested = false;
+        m_announceInFlight = true;
 
-        m_nextAnnounce = std::chrono::steady_clock::now() + std::chrono::minutes(1);
+        Announce();
     }
 }
 
@@ -43,12 +53,19 @@ void ServerListSystem::Announce() noexcept
         {
             const auto& config = GServer->GetConfig();
             auto pc = static_cast<uint16_t>(m_pWorld->get<PlayerManager>()->Count());
-            PostAnnouncement(config->Name, config->Description, config->IconUrl, GServer->GetPort(), GServer->GetTickRate(), pc, 10000, config->Tags, true, false, 0);
+            const auto interval = PostAnnouncement(config->Name, config->Description, config->IconUrl, GServer->GetPort(), GServer->GetTickRate(), pc, 10000, config->Tags, true, false, 0);
+            if (interval > 0)
+                m_announceIntervalSeconds = interval;
+
+            // Schedule from the response so a new recommendation applies to the very next announce
+            const auto next = std::chrono::steady_clock::now() + std::chrono::seconds(m_announceIntervalSeconds.load());
+            m_nextAnnounce = next.time_since_epoch().count();
+            m_announceInFlight = false;
         })
         .detach();
 }
 
-void ServerListSystem::PostAnnouncement(
+int ServerListSystem::PostAnnouncement(
     const std::string& acName, const std::string& acDesc, const std::string& acIconUrl, uint16_t aPort, uint16_t aTick, uint16_t aPlayerCount, uint16_t aPlayerMaxCount,
     const std::string& acTagList, bool aPublic, bool aPassword, int32 aFlags) noexcept
 {
@@ -102,6 +119,13 @@ void ServerListSystem::PostAnnouncement(
         else if (response->status == 200)
         {
             spdlog::info("Successfully announced to master server (players: {})", aPlayerCount);
+
+            // The master recommends when to announce next based on its load and our player churn
+            const auto body = nlohmann::json::parse(response->body, nullptr, false);
+            if (body.is_object() && body.contains("next_announce_seconds") && body["next_announce_seconds"].is_number_integer())
+            {
+                return std::clamp(body["next_announce_seconds"].get<int>(), kMinAnnounceIntervalSeconds, kMaxAnnounceIntervalSeconds);
+            }
         }
         else
         {
@@ -115,4 +139,6 @@ void ServerListSystem::PostAnnouncement(
                      to_string(error_code), static_cast<int>(error_code));
         spdlog::error("Make sure the master server is running at: {}", kMasterServerEndpoint);
     }
+
+    return 0;
 }
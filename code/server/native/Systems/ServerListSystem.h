@@ -9,12 +9,17 @@ private:
     void Tick() noexcept;
     void Announce() noexcept;
 
-    static void PostAnnouncement(
+    // Returns the announce interval recommended by the master server in seconds, or 0 if none
+    static int PostAnnouncement(
         const std::string& acName, const std::string& acDesc, const std::string& acIconUrl, uint16_t aPort, uint16_t aTick, uint16_t aPlayerCount, uint16_t aPlayerMaxCount,
         const std::string& acTagList, bool aPublic, bool aPassword, int32 aFlags) noexcept;
 
     gsl::not_null<World*> m_pWorld;
     flecs::system m_updateSystem;
     flecs::observer m_serverListObserver;
-    mutable std::chrono::steady_clock::time_point m_nextAnnounce;
+    // Shared with the announce thread, m_nextAnnounce holds steady_clock ticks
+    std::atomic<std::chrono::steady_clock::rep> m_nextAnnounce{0};
+    std::atomic<bool> m_announceRequested{true};
+    std::atomic<bool> m_announceInFlight{false};
+    std::atomic<int> m_announceIntervalSeconds{60};
 };
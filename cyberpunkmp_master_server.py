@@ -6,28 +6,348 @@ Handles server registration, heartbeats, server browser, and player statistics
 """
 
 import asyncio
+import atexit
+import bisect
+import csv
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import math
+import os
+import signal
+import socket
+import subprocess
+import sys
 import time
 import logging
+import logging.handlers
+import queue
 import sqlite3
 import ipaddress
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
-from urllib.parse import parse_qs
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Set, Iterator
+from dataclasses import dataclass, asdict, field, fields
+from urllib.parse import parse_qs, urlsplit
 import re
 
-from aiohttp import web, ClientSession
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector
+from aiohttp.abc import AbstractResolver
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
 
+# Logging pipeline tuning
+LOG_QUEUE_SIZE = 10000         # Records buffered for the writer thread before dropping
+LOG_RATE_LIMIT_BURST = 20      # Records per call site allowed in each window
+LOG_RATE_LIMIT_WINDOW = 10     # Seconds per rate limit window
+LOG_SAMPLE_RATE = 100          # Past the burst, keep one record in this many
+LOG_RATE_LIMIT_EXEMPT = ['aiohttp.access']  # Loggers that are never sampled
+
+class DropCountingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep args and exc_info so message and traceback formatting happen on the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogRateLimitFilter(logging.Filter):
+    """Per call site rate limiting, sampling records once the burst is used up"""
+
+    def __init__(self):
+        super().__init__()
+        self.windows: Dict[tuple, list] = {}  # Call site -> [window start, seen, suppressed]
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name in LOG_RATE_LIMIT_EXEMPT:
+            return True
+
+        # Messages are f-strings, so the call site is the stable message key
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        state = self.windows.get(key)
+        if state is None or record.created - state[0] >= LOG_RATE_LIMIT_WINDOW:
+            if state is not None and state[2]:
+                record.suppressed = state[2]
+            state = self.windows[key] = [record.created, 0, 0]
+
+        state[1] += 1
+        over_burst = state[1] - LOG_RATE_LIMIT_BURST
+        if over_burst <= 0:
+            return True
+
+        if over_burst % LOG_SAMPLE_RATE == 0:
+            record.suppressed = state[2]
+            state[2] = 0
+            return True
+
+        state[2] += 1
+        self.suppressed += 1
+        return False
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+_log_handler: Optional[DropCountingQueueHandler] = None
+_log_filter: Optional[LogRateLimitFilter] = None
+_log_listener: Optional[logging.handlers.QueueListener] = None
+_log_format = 'json'
+
+def configure_logging(level: int = logging.INFO, log_format: str = 'json'):
+    """Route all logging through a bounded queue drained by a background writer thread"""
+    global _log_handler, _log_filter, _log_listener, _log_format
+
+    _log_format = log_format
+    root = logging.getLogger()
+    if _log_listener is not None:
+        _log_listener.stop()
+        root.removeHandler(_log_handler)
+
+    stream_handler = logging.StreamHandler()
+    if log_format == 'json':
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    _log_filter = LogRateLimitFilter()
+    _log_handler = DropCountingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _log_handler.addFilter(_log_filter)
+    _log_listener = logging.handlers.QueueListener(_log_handler.queue, stream_handler)
+
+    root.addHandler(_log_handler)
+    root.setLevel(level)
+    _log_listener.start()
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+def get_logging_stats() -> Dict[str, int]:
+    """Get logging pipeline counters"""
+    if _log_handler is None:
+        return {'queued': 0, 'dropped': 0, 'suppressed': 0}
+    return {
+        'queued': _log_handler.queue.qsize(),
+        'dropped': _log_handler.dropped,
+        'suppressed': _log_filter.suppressed
+    }
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
+atexit.register(stop_logging)
 logger = logging.getLogger('CyberpunkMP-Master')
 
+DATABASE_PATH = 'cyberpunkmp_master.db'
+
+# Bulk ban import/export tuning
+BAN_IMPORT_BATCH_SIZE = 5000   # Rows per import transaction
+BAN_EXPORT_CHUNK_SIZE = 1000   # Rows fetched per export query
+BAN_IMPORT_MAX_ERRORS = 50     # Per-line errors echoed back to the caller
+BAN_IMPORT_MAX_LINE = 65536    # Longest import line in bytes; longer lines are skipped
+
+# History export tuning
+HISTORY_EXPORT_CHUNK_SIZE = 5000  # Rows fetched per export query
+
+# Player session ingestion tuning
+PLAYER_STATS_FLUSH_INTERVAL = 60   # Seconds between player_stats upserts
+PLAYER_EVENTS_MAX_BATCH = 5000     # Events accepted per report
+PLAYER_EVENT_MAX_AGE = 600         # Older event timestamps are clamped (seconds)
+PLAYER_SERVERS_PLAYED_MAX = 50     # Most recent servers kept in a player's servers_played
+UNIQUE_PLAYER_SKETCH_DAYS = 7      # Days of unique-player sketches kept in memory
+UNIQUE_PLAYER_SKETCH_PRECISION = 12  # 4096 registers, ~1.6% standard error
+UNIQUE_PLAYER_SERVER_SKETCH_PRECISION = 10  # Per-server sketches: 1024 registers, ~3.3% standard error
+
+# Leaderboard tuning
+LEADERBOARD_SIZE = 10                # Entries kept per board
+LEADERBOARD_REFRESH_INTERVAL = 30    # Seconds between window expiry/rebuild passes
+LEADERBOARD_MAX_GAP = 300            # Longest announce gap credited as player-minutes
+LEADERBOARD_GROWTH_HALF_LIFE = 900   # Smoothing half-life for growth rate (seconds)
+
+# Graceful reload (listening socket handoff)
+SNAPSHOT_PATH = 'cyberpunkmp_master.snapshot.json'
+HANDOFF_READY_TIMEOUT = 30   # Seconds to wait for the successor to start serving
+HANDOFF_DRAIN_TIMEOUT = 30   # Seconds given to in-flight requests before exiting
+HANDOFF_WRITE_TIMEOUT = 5    # Seconds in-flight writes get to land before the snapshot
+HANDOFF_EXIT_CODE = 75       # Exit status telling launchers a successor took over
+
+# Batch announce limits
+ANNOUNCE_BATCH_MAX_SIZE = 500  # Servers per batch request
+ANNOUNCE_MIN_INTERVAL = 5      # Seconds between batched announces of one server
+
+# Admission control: route class -> (max concurrent requests, max queueing delay
+# in seconds or None to never shed). Announces are never shed.
+ADMISSION_LIMITS = {
+    'announce': (64, None),
+    'read': (32, 0.25),
+    'bulk': (2, 1.0),
+    'admin': (4, 5.0)
+}
+ADMISSION_RETRY_AFTER = 2          # Seconds suggested to shed clients
+LOOP_LAG_SAMPLE_INTERVAL = 0.1     # Seconds between event loop lag samples
+LOOP_LAG_SHED_THRESHOLD = 0.2      # Smoothed loop lag (seconds) above which reads are shed
+
+# Heartbeat negotiation: the announce response recommends the next interval
+HEARTBEAT_DEFAULT_INTERVAL = 60      # Seconds, what servers use without a recommendation
+HEARTBEAT_MIN_INTERVAL = 15          # Fastest recommended interval
+HEARTBEAT_MAX_INTERVAL = 120         # Slowest recommended interval
+HEARTBEAT_LIVENESS_MULTIPLIER = 5    # Intervals without a heartbeat before a server is offline
+HEARTBEAT_CHANGE_SCALE = 60          # Player count change (players/hour) that halves the interval
+
+# Icon proxy tuning
+ICON_CACHE_DIR = 'icon_cache'
+ICON_CACHE_MAX_BYTES = 64 * 1024 * 1024  # LRU cap for the on-disk cache
+ICON_MAX_BYTES = 512 * 1024              # Largest icon accepted
+ICON_FETCH_CONCURRENCY = 4               # Simultaneous upstream fetches
+ICON_FETCH_TIMEOUT = 10                  # Seconds per upstream fetch
+ICON_RETRY_AFTER = 3600                  # Seconds before retrying a failed icon URL
+ICON_MAX_PENDING = 256                   # Queued fetches; later requests are dropped until it drains
+ICON_MAX_URLS = 8192                     # Source URLs remembered in the index
+ICON_MAX_FAILED = 8192                   # Failed URLs remembered for the retry backoff
+ICON_INDEX_SAVE_DELAY = 5                # Seconds to batch index changes before writing
+ICON_CACHE_MAX_AGE = 31536000            # Cache-Control max-age for served icons
+
+# Simulation clock tuning
+SIMULATION_STEP = 0.1             # Real seconds between virtual clock advances
+SIMULATION_SETTLE_YIELDS = 1000   # Most loop iterations a woken task gets to go back to sleep
+
+class CoarseClock:
+    """Wall clock read once per event loop tick
+
+    Everything running in the same tick sees the same time. Outside a running
+    loop it falls through to time.time().
+    """
+
+    def __init__(self):
+        self.cached_time = 0.0
+        self.cached_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def time(self) -> float:
+        """Get the current unix time"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return time.time()
+
+        if self.cached_loop is not loop:
+            self.cached_time = time.time()
+            self.cached_loop = loop
+            # Runs after everything already queued for this tick
+            loop.call_soon(self.expire)
+        return self.cached_time
+
+    def expire(self):
+        """Drop the cached time so the next tick reads the clock again"""
+        self.cached_loop = None
+
+    async def sleep(self, seconds: float):
+        """Sleep for the given number of seconds"""
+        await asyncio.sleep(seconds)
+
+    async def run(self):
+        """Drive the clock (the real clock needs no driving)"""
+
+class VirtualClock(CoarseClock):
+    """Simulated clock that only moves when advanced
+
+    Tasks sleeping on it are woken one at a time in deadline order, each with
+    time set to its deadline and run until it sleeps again, so scheduled work
+    happens deterministically however fast time is advanced.
+    """
+
+    def __init__(self, start: Optional[float] = None, speed: float = 0.0):
+        super().__init__()
+        self.now = time.time() if start is None else start
+        self.speed = speed  # Simulated seconds per real second for run()
+        self.sleepers: List[tuple] = []  # Heap of (deadline, sequence, task, future)
+        self.sequence = 0
+        self.waking: Optional[asyncio.Task] = None
+
+    def time(self) -> float:
+        """Get the current simulated unix time"""
+        return self.now
+
+    async def sleep(self, seconds: float):
+        """Sleep until the clock is advanced past the deadline"""
+        task = asyncio.current_task()
+        if self.waking is task:
+            self.waking = None
+
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.sleepers, (self.now + seconds, self.sequence, task, future))
+        self.sequence += 1
+        await future
+
+    async def advance(self, seconds: float):
+        """Move time forward, running every sleeper that comes due on the way"""
+        target = self.now + seconds
+        while self.sleepers and self.sleepers[0][0] <= target:
+            deadline, _, task, future = heapq.heappop(self.sleepers)
+            if future.done():
+                continue
+            self.now = max(self.now, deadline)
+            self.waking = task
+            future.set_result(None)
+
+            # Let the task run until it sleeps again or finishes
+            for _ in range(SIMULATION_SETTLE_YIELDS):
+                if self.waking is None or task.done():
+                    break
+                await asyncio.sleep(0)
+            self.waking = None
+
+        self.now = max(self.now, target)
+
+    async def run(self):
+        """Advance simulated time at speed times real time"""
+        while self.speed > 0:
+            await asyncio.sleep(SIMULATION_STEP)
+            await self.advance(SIMULATION_STEP * self.speed)
+
+clock = CoarseClock()
+
+def set_clock(new_clock: CoarseClock):
+    """Replace the clock used for timestamps, expiry and background tasks"""
+    global clock
+    clock = new_clock
+
+def parse_tags(tags: str) -> List[str]:
+    """Split a comma separated tag string into unique, non-empty tags"""
+    return list(dict.fromkeys(tag.strip() for tag in tags.split(',') if tag.strip()))
+
 @dataclass
 class ServerInfo:
     """Server information data structure"""
@@ -50,20 +370,36 @@ class ServerInfo:
     uptime_minutes: int = 0
     region: str = "Unknown"
     game_mode: str = "Freeplay"
+    tag_list: List[str] = field(default_factory=list)
+    cached_icon_url: str = ''
+    heartbeat_interval: int = HEARTBEAT_DEFAULT_INTERVAL
+
+    def __post_init__(self):
+        # Snapshots from before tags were parsed on announce only carry the raw string
+        if self.tags and not self.tag_list:
+            self.tag_list = parse_tags(self.tags)
+
+    def to_dict(self, base_url: str = '') -> Dict[str, Any]:
+        """Convert to dictionary for JSON serialization
+
+        base_url completes cached icon paths stored relative to the master server.
+        """
+        icon_url = self.cached_icon_url or self.icon_url
+        if icon_url.startswith('/'):
+            icon_url = base_url + icon_url
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
         return {
             'name': self.name,
             'description': self.desc,
-            'icon_url': self.icon_url,
+            'icon_url': icon_url,
+            'icon_source_url': self.icon_url,
             'version': self.version,
             'ip': self.ip,
             'port': self.port,
             'tick_rate': self.tick,
             'player_count': self.player_count,
             'max_player_count': self.max_player_count,
-            'tags': self.tags.split(',') if self.tags else [],
+            'tags': list(self.tag_list),
             'public': self.public,
             'password_protected': self.password,
             'flags': self.flags,
@@ -76,22 +412,724 @@ class ServerInfo:
 
     def calculate_ping(self) -> int:
         """Calculate simulated ping based on last heartbeat"""
-        time_since_heartbeat = time.time() - self.last_heartbeat
+        time_since_heartbeat = clock.time() - self.last_heartbeat
         return min(int(time_since_heartbeat * 1000), 999)  # Max 999ms ping
 
-    def is_online(self, timeout_minutes: int = 5) -> bool:
+    def get_liveness_window(self) -> float:
+        """Seconds without a heartbeat before the server counts as offline
+
+        Servers that ignore a shorter recommendation still announce at the
+        default interval, so the window never shrinks below the default.
+        """
+        interval = max(self.heartbeat_interval, HEARTBEAT_DEFAULT_INTERVAL)
+        return interval * HEARTBEAT_LIVENESS_MULTIPLIER
+
+    def is_online(self, timeout_minutes: Optional[int] = None) -> bool:
         """Check if server is considered online"""
-        return (time.time() - self.last_heartbeat) < (timeout_minutes * 60)
+        if timeout_minutes is None:
+            timeout = self.get_liveness_window()
+        else:
+            timeout = timeout_minutes * 60
+        return (clock.time() - self.last_heartbeat) < timeout
+
+@dataclass
+class PendingPlayerStats:
+    """Player statistics accumulated in memory until the next flush"""
+    player_name: Optional[str]
+    first_seen: float
+    last_seen: float
+    region: str
+    playtime_minutes: int = 0
+    servers: Set[str] = field(default_factory=set)
+
+class HyperLogLog:
+    """Approximate distinct counter using a fixed number of registers
+
+    Starts sparse, as a sorted array of packed (register, rank) entries, and
+    switches to dense registers once those would be smaller.
+    """
+
+    def __init__(self, precision: int = UNIQUE_PLAYER_SKETCH_PRECISION):
+        self.precision = precision
+        self.sparse: Optional[array] = array('I')  # (register << 8) | rank
+        self.registers: Optional[bytearray] = None
+
+    def add(self, value: str):
+        """Add a value to the sketch"""
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+
+        # Top bits pick the register, the rest give the leading-zero rank
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+
+        if self.registers is not None:
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+            return
+
+        position = bisect.bisect_left(self.sparse, index << 8)
+        if position < len(self.sparse) and self.sparse[position] >> 8 == index:
+            if rank > self.sparse[position] & 0xFF:
+                self.sparse[position] = (index << 8) | rank
+            return
+
+        self.sparse.insert(position, (index << 8) | rank)
+        if len(self.sparse) * self.sparse.itemsize >= 1 << self.precision:
+            self.densify()
+
+    def densify(self):
+        """Switch from sparse entries to one byte per register"""
+        self.registers = bytearray(1 << self.precision)
+        for entry in self.sparse:
+            self.registers[entry >> 8] = entry & 0xFF
+        self.sparse = None
+
+    def count(self) -> int:
+        """Estimate the number of distinct values added"""
+        registers = 1 << self.precision
+        if self.registers is not None:
+            zeros = self.registers.count(0)
+            harmonic = sum(2.0 ** -r for r in self.registers)
+        else:
+            zeros = registers - len(self.sparse)
+            harmonic = zeros + sum(2.0 ** -(entry & 0xFF) for entry in self.sparse)
+
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers * registers / harmonic
+
+        # Small range correction (linear counting)
+        if estimate <= 2.5 * registers and zeros:
+            estimate = registers * math.log(registers / zeros)
+
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for snapshots"""
+        if self.registers is not None:
+            return {'precision': self.precision, 'registers': self.registers.hex()}
+        return {'precision': self.precision, 'sparse': self.sparse.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        """Restore a sketch written by to_dict"""
+        sketch = cls(data.get('precision', UNIQUE_PLAYER_SKETCH_PRECISION))
+        if 'registers' in data:
+            sketch.registers = bytearray.fromhex(data['registers'])
+            sketch.sparse = None
+        else:
+            sketch.sparse = array('I', data['sparse'])
+        return sketch
+
+class RollingSum:
+    """Sum of values over a sliding time window, kept in fixed-width buckets"""
+
+    def __init__(self, window: float, bucket_width: float):
+        self.window = window
+        self.bucket_width = bucket_width
+        self.buckets = deque()  # (bucket start, value)
+        self.total = 0.0
+
+    def add(self, timestamp: float, value: float):
+        """Add a value at the given time"""
+        bucket_start = timestamp - timestamp % self.bucket_width
+        if self.buckets and self.buckets[-1][0] == bucket_start:
+            self.buckets[-1][1] += value
+        else:
+            self.buckets.append([bucket_start, value])
+        self.total += value
+        self.expire(timestamp)
+
+    def expire(self, timestamp: float):
+        """Drop buckets that fell out of the window"""
+        while self.buckets and self.buckets[0][0] <= timestamp - self.window:
+            self.total -= self.buckets.popleft()[1]
+        if not self.buckets:
+            self.total = 0.0
+
+class TopK:
+    """Top-K scores maintained incrementally, rebuilt only when an entry may have fallen out"""
+
+    def __init__(self, size: int = LEADERBOARD_SIZE):
+        self.size = size
+        self.scores: Dict[str, float] = {}
+        self.top: List[tuple] = []  # (score, key) sorted descending
+        self.dirty = False
+
+    def update(self, key: str, score: float):
+        """Set the score for a key"""
+        previous = self.scores.get(key)
+        self.scores[key] = score
+        in_top = any(k == key for _, k in self.top)
+
+        if in_top:
+            if score == previous:
+                return
+            self.top = [(sc, k) if k != key else (score, k) for sc, k in self.top]
+            self.top.sort(reverse=True)
+            # A lowered last entry may have been overtaken by one outside the top
+            if score < previous and self.top[-1][1] == key and len(self.scores) > len(self.top):
+                self.dirty = True
+        elif len(self.top) < self.size or score > self.top[-1][0]:
+            self.top.append((score, key))
+            self.top.sort(reverse=True)
+            del self.top[self.size:]
+
+    def remove(self, key: str):
+        """Remove a key from the board"""
+        if self.scores.pop(key, None) is not None and any(k == key for _, k in self.top):
+            self.top = [(sc, k) for sc, k in self.top if k != key]
+            self.dirty = True
+
+    def rebuild(self):
+        """Recompute the top entries from all scores"""
+        self.top = heapq.nlargest(self.size, ((sc, k) for k, sc in self.scores.items()))
+        self.dirty = False
+
+@dataclass
+class ServerTrend:
+    """Per-server rolling activity used by the leaderboards"""
+    player_count: int
+    last_update: float
+    growth_rate: float = 0.0  # Smoothed players per hour
+    minutes_1h: RollingSum = field(default_factory=lambda: RollingSum(3600, 60))
+    minutes_24h: RollingSum = field(default_factory=lambda: RollingSum(86400, 900))
+
+class ServerLeaderboards:
+    """Top-K server boards updated incrementally from announce deltas"""
+
+    BOARDS = ['players', 'player_minutes_1h', 'player_minutes_24h', 'growth']
+
+    def __init__(self, size: int = LEADERBOARD_SIZE):
+        self.trends: Dict[str, ServerTrend] = {}
+        self.boards: Dict[str, TopK] = {name: TopK(size) for name in self.BOARDS}
+
+    def record_announce(self, server_id: str, player_count: int, timestamp: float):
+        """Fold one heartbeat into the server's trend and the boards"""
+        trend = self.trends.get(server_id)
+        if trend is None:
+            trend = self.trends[server_id] = ServerTrend(player_count=player_count, last_update=timestamp)
+        else:
+            elapsed = timestamp - trend.last_update
+            if elapsed > 0:
+                # Credit the previous count for the time since the last heartbeat
+                credited = min(elapsed, LEADERBOARD_MAX_GAP)
+                player_minutes = trend.player_count * credited / 60
+                trend.minutes_1h.add(timestamp, player_minutes)
+                trend.minutes_24h.add(timestamp, player_minutes)
+
+                # Exponentially smoothed growth in players per hour
+                rate = (player_count - trend.player_count) / elapsed * 3600
+                weight = 1 - 0.5 ** (elapsed / LEADERBOARD_GROWTH_HALF_LIFE)
+                trend.growth_rate += weight * (rate - trend.growth_rate)
+
+            trend.player_count = player_count
+            trend.last_update = timestamp
+
+        self.update_boards(server_id, trend)
+
+    def update_boards(self, server_id: str, trend: ServerTrend):
+        """Push a server's current scores to every board"""
+        self.boards['players'].update(server_id, trend.player_count)
+        self.boards['player_minutes_1h'].update(server_id, trend.minutes_1h.total)
+        self.boards['player_minutes_24h'].update(server_id, trend.minutes_24h.total)
+        self.boards['growth'].update(server_id, trend.growth_rate)
+        self.rebuild_dirty_boards()
+
+    def remove_server(self, server_id: str):
+        """Forget a server entirely"""
+        self.trends.pop(server_id, None)
+        for board in self.boards.values():
+            board.remove(server_id)
+        self.rebuild_dirty_boards()
+
+    def rebuild_dirty_boards(self):
+        """Rebuild boards whose top entries can no longer be trusted"""
+        for board in self.boards.values():
+            if board.dirty:
+                board.rebuild()
+
+    def refresh(self, online_ids: Set[str], timestamp: float):
+        """Expire rolling windows and drop offline servers from the live boards"""
+        for server_id, trend in self.trends.items():
+            trend.minutes_1h.expire(timestamp)
+            trend.minutes_24h.expire(timestamp)
+            self.boards['player_minutes_1h'].scores[server_id] = trend.minutes_1h.total
+            self.boards['player_minutes_24h'].scores[server_id] = trend.minutes_24h.total
+            if server_id in online_ids:
+                self.boards['players'].scores[server_id] = trend.player_count
+                self.boards['growth'].scores[server_id] = trend.growth_rate
+            else:
+                # Offline servers keep their history but not a live score
+                self.boards['players'].scores.pop(server_id, None)
+                self.boards['growth'].scores.pop(server_id, None)
+
+        for board in self.boards.values():
+            board.rebuild()
+
+    def get_top(self, board: str, limit: int) -> List[tuple]:
+        """Get the top (score, server ID) pairs of a board"""
+        return self.boards[board].top[:limit]
+
+class FacetIndex:
+    """Per-facet value -> server ID sets, maintained on announce"""
+
+    FACETS = ['region', 'version', 'tags']
+
+    def __init__(self):
+        self.sets: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet in self.FACETS}
+        self.indexed: Dict[str, Dict[str, List[str]]] = {}  # Server ID -> facet -> values
+
+    def get_values(self, server: ServerInfo) -> Dict[str, List[str]]:
+        """Get the facet values of a server"""
+        return {
+            'region': [server.region],
+            'version': [server.version],
+            'tags': server.tag_list
+        }
+
+    def update(self, server_id: str, server: ServerInfo):
+        """Index a server, moving it between sets only if its values changed"""
+        values = self.get_values(server)
+        previous = self.indexed.get(server_id)
+        if previous == values:
+            return
+
+        if previous is not None:
+            self.remove(server_id)
+
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                self.sets[facet].setdefault(value, set()).add(server_id)
+        self.indexed[server_id] = {facet: list(facet_values) for facet, facet_values in values.items()}
+
+    def remove(self, server_id: str):
+        """Drop a server from every set"""
+        previous = self.indexed.pop(server_id, None)
+        if previous is None:
+            return
+
+        for facet, facet_values in previous.items():
+            for value in facet_values:
+                members = self.sets[facet].get(value)
+                if members is not None:
+                    members.discard(server_id)
+                    if not members:
+                        del self.sets[facet][value]
+
+    def lookup(self, facet: str, value: str, case_sensitive: bool = True) -> Set[str]:
+        """Get the servers having a facet value"""
+        if case_sensitive:
+            return self.sets[facet].get(value, set())
+
+        matches = set()
+        for candidate, members in self.sets[facet].items():
+            if candidate.lower() == value.lower():
+                matches |= members
+        return matches
+
+    def count(self, facet: str, server_ids: Set[str]) -> Dict[str, int]:
+        """Count facet values within a result set by intersecting with each value set"""
+        counts = {}
+        for value, members in self.sets[facet].items():
+            if len(members) < len(server_ids):
+                matched = sum(1 for sid in members if sid in server_ids)
+            else:
+                matched = sum(1 for sid in server_ids if sid in members)
+            if matched:
+                counts[value] = matched
+        return counts
+
+class PinnedResolver(AbstractResolver):
+    """aiohttp resolver that only answers with addresses resolved and vetted beforehand"""
+
+    def __init__(self, addresses: List[Dict[str, Any]]):
+        self.addresses = addresses
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        """Return the pinned addresses for the vetted host"""
+        results = [dict(a, port=port) for a in self.addresses if a['hostname'] == host]
+        if not results:
+            raise OSError(f'Host {host} was not vetted')
+        return results
+
+    async def close(self):
+        """Nothing to release"""
+
+class IconCache:
+    """Content-hashed on-disk icon cache with an LRU size cap
+
+    Icons are fetched in the background with bounded concurrency and stored
+    as <sha256>.<ext>, so identical images from different URLs share a file.
+    """
+
+    CONTENT_TYPES = {
+        'image/png': 'png',
+        'image/jpeg': 'jpg',
+        'image/gif': 'gif',
+        'image/webp': 'webp'
+    }
+
+    def __init__(self, cache_dir: str = ICON_CACHE_DIR, max_bytes: int = ICON_CACHE_MAX_BYTES,
+                 allow_private_hosts: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.allow_private_hosts = allow_private_hosts
+        self.entries: OrderedDict = OrderedDict()  # Content hash -> (content type, size), LRU order
+        self.urls: OrderedDict = OrderedDict()     # Source URL -> content hash, oldest first
+        self.failed: OrderedDict = OrderedDict()   # Source URL -> time of last failure, oldest first
+        self.pending: Dict[str, asyncio.Task] = {}  # Source URL -> fetch task
+        self.total_bytes = 0
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.save_task: Optional[asyncio.Task] = None
+        self.on_cached = None  # Callback(source URL, content hash)
+        self.on_evicted = None  # Callback(content hash)
+        self.load_index()
+
+    def load_index(self):
+        """Restore the URL index and the files already on disk"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        index = {}
+        try:
+            with open(os.path.join(self.cache_dir, 'index.json'), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        extensions = {ext: content_type for content_type, ext in self.CONTENT_TYPES.items()}
+        files = sorted(os.scandir(self.cache_dir), key=lambda e: e.stat().st_mtime)
+        for entry in files:
+            content_hash, _, ext = entry.name.partition('.')
+            if ext in extensions and len(content_hash) == 64:
+                size = entry.stat().st_size
+                self.entries[content_hash] = (extensions[ext], size)
+                self.total_bytes += size
+
+        urls = [(url, h) for url, h in index.get('urls', {}).items() if h in self.entries]
+        self.urls = OrderedDict(urls[-ICON_MAX_URLS:])
+
+    def save_index(self):
+        """Write the URL index soon, batching changes that arrive meanwhile"""
+        if self.save_task is None:
+            self.save_task = asyncio.get_running_loop().create_task(self.save_index_later())
+
+    async def save_index_later(self):
+        """Write the URL index after a short delay, off the event loop"""
+        try:
+            await asyncio.sleep(ICON_INDEX_SAVE_DELAY)
+        finally:
+            self.save_task = None
+            await asyncio.get_running_loop().run_in_executor(None, self.write_index, dict(self.urls))
+
+    def write_index(self, urls: Dict[str, str]):
+        """Atomically write the URL index (runs in a worker thread)"""
+        path = os.path.join(self.cache_dir, 'index.json')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'urls': urls}, f)
+        os.replace(temp_path, path)
+
+    def get_path(self, content_hash: str) -> str:
+        """Get the file path of a cached icon"""
+        content_type = self.entries[content_hash][0]
+        return os.path.join(self.cache_dir, f"{content_hash}.{self.CONTENT_TYPES[content_type]}")
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Get the content hash cached for a source URL"""
+        return self.urls.get(url)
+
+    def request(self, url: str):
+        """Schedule a background fetch unless cached, in flight or recently failed
+
+        Past ICON_MAX_PENDING the request is dropped; the next announce asks again.
+        """
+        if not url or url in self.urls or url in self.pending or len(self.pending) >= ICON_MAX_PENDING:
+            return
+
+        # Failures are kept oldest first, so expired backoffs come off the front
+        now = clock.time()
+        while self.failed and now - next(iter(self.failed.values())) >= ICON_RETRY_AFTER:
+            self.failed.popitem(last=False)
+        if url in self.failed:
+            return
+
+        task = asyncio.get_running_loop().create_task(self.fetch(url))
+        self.pending[url] = task
+        task.add_done_callback(lambda _: self.pending.pop(url, None))
+
+    async def resolve_host(self, host: str) -> List[Dict[str, Any]]:
+        """Resolve an icon host, refusing private or loopback addresses"""
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+
+        results = []
+        for family, _, proto, _, sockaddr in infos:
+            address = ipaddress.ip_address(sockaddr[0])
+            if not self.allow_private_hosts and (address.is_private or address.is_loopback or
+                                                 address.is_link_local or address.is_reserved):
+                raise ValueError(f'Icon host {host} resolves to a private address')
+            results.append({
+                'hostname': host,
+                'host': str(address),
+                'port': 0,
+                'family': family,
+                'proto': proto,
+                'flags': socket.AI_NUMERICHOST
+            })
+
+        if not results:
+            raise ValueError(f'Icon host {host} did not resolve')
+        return results
+
+    async def fetch(self, url: str):
+        """Download an icon and add it to the cache"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(ICON_FETCH_CONCURRENCY)
+
+        try:
+            async with self.semaphore:
+                parts = urlsplit(url)
+                if parts.scheme not in ['http', 'https'] or not parts.hostname:
+                    raise ValueError('Unsupported icon URL')
+
+                # Connect only to the addresses vetted here, so a second lookup
+                # can't be rebound to a private address, and never follow
+                # redirects off the vetted host
+                addresses = await self.resolve_host(parts.hostname)
+                connector = TCPConnector(resolver=PinnedResolver(addresses))
+                async with ClientSession(connector=connector, timeout=ClientTimeout(total=ICON_FETCH_TIMEOUT)) as session:
+                    async with session.get(url, allow_redirects=False) as response:
+                        content_type = response.content_type
+                        if response.status != 200:
+                            raise ValueError(f'HTTP {response.status}')
+                        if content_type not in self.CONTENT_TYPES:
+                            raise ValueError(f'Unsupported content type {content_type}')
+                        if (response.content_length or 0) > ICON_MAX_BYTES:
+                            raise ValueError('Icon too large')
+
+                        body = bytearray()
+                        async for chunk in response.content.iter_chunked(16384):
+                            body.extend(chunk)
+                            if len(body) > ICON_MAX_BYTES:
+                                raise ValueError('Icon too large')
+
+            content_hash = hashlib.sha256(body).hexdigest()
+            if content_hash not in self.entries:
+                path = os.path.join(self.cache_dir, f"{content_hash}.{self.CONTENT_TYPES[content_type]}")
+                await asyncio.get_running_loop().run_in_executor(None, self.write_file, path, bytes(body))
+                self.entries[content_hash] = (content_type, len(body))
+                self.total_bytes += len(body)
+            self.urls[url] = content_hash
+            while len(self.urls) > ICON_MAX_URLS:
+                self.urls.popitem(last=False)
+            self.failed.pop(url, None)
+            self.save_index()
+            self.evict()
+
+            if self.on_cached:
+                self.on_cached(url, content_hash)
+
+        except Exception as e:
+            self.failed.pop(url, None)
+            self.failed[url] = clock.time()
+            while len(self.failed) > ICON_MAX_FAILED:
+                self.failed.popitem(last=False)
+            logger.warning(f"Failed to fetch icon {url}: {e}")
+
+    def write_file(self, path: str, body: bytes):
+        """Atomically write an icon file (runs in a worker thread)"""
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(body)
+        os.replace(f"{path}.tmp", path)
+
+    def touch(self, content_hash: str):
+        """Mark an icon as recently used"""
+        self.entries.move_to_end(content_hash)
+
+    def evict(self):
+        """Drop least recently used icons until the cache fits its cap"""
+        evicted = False
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            content_hash = next(iter(self.entries))
+            path = self.get_path(content_hash)
+            _, size = self.entries.pop(content_hash)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            self.urls = OrderedDict((url, h) for url, h in self.urls.items() if h != content_hash)
+            evicted = True
+            if self.on_evicted:
+                self.on_evicted(content_hash)
+
+        if evicted:
+            self.save_index()
+
+    async def close(self):
+        """Stop in-flight fetches and write any unsaved index changes"""
+        for task in list(self.pending.values()):
+            task.cancel()
+        if self.save_task is not None:
+            # Cancelling skips the delay; the write itself still runs
+            self.save_task.cancel()
+            await asyncio.gather(self.save_task, return_exceptions=True)
+
+class AdmissionClass:
+    """Bounded concurrency with a FIFO wait queue for one class of routes"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue_delay: Optional[float]):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue_delay = max_queue_delay
+        self.active = 0
+        self.waiters = deque()  # (enqueued at, future)
+        self.counters = {
+            'admitted': 0,
+            'queued': 0,
+            'shed_queue_delay': 0,
+            'shed_loop_lag': 0,
+            'shed_priority': 0,
+            'queue_delay_total_ms': 0.0,
+            'queue_delay_max_ms': 0.0
+        }
+
+    def head_delay(self, now: float) -> float:
+        """Seconds the oldest waiter has been queued"""
+        return now - self.waiters[0][0] if self.waiters else 0.0
+
+    async def acquire(self) -> bool:
+        """Wait for a slot, returning False if the request should be shed"""
+        now = time.monotonic()
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            self.counters['admitted'] += 1
+            return True
+
+        # Shed early once the queue is already building past half the budget
+        if self.max_queue_delay is not None and self.head_delay(now) > self.max_queue_delay / 2:
+            self.counters['shed_queue_delay'] += 1
+            return False
+
+        entry = (now, asyncio.get_running_loop().create_future())
+        self.waiters.append(entry)
+        self.counters['queued'] += 1
+
+        try:
+            await asyncio.wait_for(entry[1], self.max_queue_delay)
+        except asyncio.TimeoutError:
+            self.abandon(entry)
+            self.counters['shed_queue_delay'] += 1
+            return False
+        except asyncio.CancelledError:
+            self.abandon(entry)
+            raise
+
+        self.counters['admitted'] += 1
+        return True
+
+    def abandon(self, entry: tuple):
+        """Leave the queue, passing on a slot that was handed over as we gave up"""
+        future = entry[1]
+        if future.done() and not future.cancelled():
+            self.release()
+            return
+        try:
+            self.waiters.remove(entry)
+        except ValueError:
+            pass
+
+    def release(self):
+        """Hand the slot to the next live waiter, or free it"""
+        now = time.monotonic()
+        while self.waiters:
+            enqueued_at, future = self.waiters.popleft()
+            if not future.done():
+                delay_ms = (now - enqueued_at) * 1000
+                self.counters['queue_delay_total_ms'] += delay_ms
+                self.counters['queue_delay_max_ms'] = max(self.counters['queue_delay_max_ms'], delay_ms)
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters and current occupancy"""
+        stats = dict(self.counters)
+        stats['queue_delay_total_ms'] = round(stats['queue_delay_total_ms'], 2)
+        stats['queue_delay_max_ms'] = round(stats['queue_delay_max_ms'], 2)
+        stats['active'] = self.active
+        stats['waiting'] = len(self.waiters)
+        stats['max_concurrency'] = self.max_concurrency
+        stats['current_queue_delay_ms'] = round(self.head_delay(time.monotonic()) * 1000, 2)
+        return stats
+
+class AdmissionController:
+    """Per route class admission with priority for announces over reads"""
+
+    def __init__(self):
+        self.classes = {
+            name: AdmissionClass(name, concurrency, queue_delay)
+            for name, (concurrency, queue_delay) in ADMISSION_LIMITS.items()
+        }
+        self.loop_lag = 0.0  # Smoothed event loop lag in seconds
+
+    async def acquire(self, name: str) -> bool:
+        """Admit or shed a request of the given class"""
+        admission_class = self.classes[name]
+
+        if name == 'read':
+            # Reads give way when heartbeats are queueing or the loop is lagging
+            if self.classes['announce'].waiters:
+                admission_class.counters['shed_priority'] += 1
+                return False
+            if self.loop_lag > LOOP_LAG_SHED_THRESHOLD:
+                admission_class.counters['shed_loop_lag'] += 1
+                return False
+
+        return await admission_class.acquire()
+
+    def release(self, name: str):
+        """Release a slot of the given class"""
+        self.classes[name].release()
+
+    async def monitor_loop_lag(self):
+        """Sample how late the event loop wakes us up"""
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_SAMPLE_INTERVAL)
+            lag = max(time.monotonic() - started - LOOP_LAG_SAMPLE_INTERVAL, 0.0)
+            self.loop_lag += 0.3 * (lag - self.loop_lag)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission counters for operators"""
+        return {
+            'loop_lag_ms': round(self.loop_lag * 1000, 2),
+            'classes': {name: c.get_stats() for name, c in self.classes.items()}
+        }
 
 class CyberpunkMPMasterServer:
     """CyberpunkMP Master Server Implementation"""
 
-    def __init__(self, host: str = '127.0.0.1', port: int = 8000):
+    def __init__(self, host: str = '127.0.0.1', port: int = 8000, public_url: Optional[str] = None,
+                 icon_cache: Optional[IconCache] = None):
         self.host = host
         self.port = port
+        # Without a configured public URL, icon links follow the Host of each request
+        self.public_url = (public_url or '').rstrip('/')
+        self.handed_off = False
+        # While a reload runs, writes are turned away so the snapshot stays
+        # consistent, and bulk transfers are cut short rather than waited for
+        self.draining = False
+        self.write_requests: Set[asyncio.Task] = set()
+        self.bulk_requests: Set[asyncio.Task] = set()
+        self.pid_file: Optional[str] = None
         self.servers: Dict[str, ServerInfo] = {}
         self.banned_servers: Dict[str, str] = {}  # IP -> reason
         self.banned_players: Dict[str, str] = {}  # Player ID -> reason
+        self.ban_expiry: Dict[tuple, float] = {}  # (type, target) -> expiry of temporary bans
         self.stats = {
             'total_servers_registered': 0,
             'total_announcements': 0,
@@ -99,11 +1137,34 @@ class CyberpunkMPMasterServer:
             'total_players_online': 0,
             'peak_servers': 0,
             'peak_players': 0,
-            'server_start_time': time.time()
+            'server_start_time': clock.time()
         }
 
+        # Player session tracking
+        self.player_sessions: Dict[str, Dict[str, float]] = {}  # Server ID -> player ID -> session start
+        self.pending_player_stats: Dict[str, PendingPlayerStats] = {}  # Player ID -> unflushed stats
+        self.unique_player_sketches: Dict[tuple, HyperLogLog] = {}  # (scope, key, day) -> sketch
+
+        # Server leaderboards
+        self.leaderboards = ServerLeaderboards()
+
+        # Open server_history runs: server ID -> [row id, player count, status, end time, start time]
+        self.history_runs: Dict[str, list] = {}
+
+        # Overload protection
+        self.admission = AdmissionController()
+
+        # Facet sets for filtering and sidebar counts
+        self.facets = FacetIndex()
+
+        # Local icon proxy
+        self.icons = icon_cache or IconCache()
+        self.icons.on_cached = self.on_icon_cached
+        self.icons.on_evicted = self.on_icon_evicted
+
         # Initialize database
         self.init_database()
+        self.load_bans()
 
         # Create web application
         self.app = web.Application()
@@ -113,7 +1174,7 @@ class CyberpunkMPMasterServer:
 
     def init_database(self):
         """Initialize SQLite database for persistent storage"""
-        self.db = sqlite3.connect('cyberpunkmp_master.db', check_same_thread=False)
+        self.db = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
         cursor = self.db.cursor()
 
         # Create servers table
@@ -152,7 +1213,8 @@ class CyberpunkMPMasterServer:
             )
         ''')
 
-        # Create server history table
+        # Create server history table. Each row is a run of heartbeats with the
+        # same player_count/status from timestamp to end_time.
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS server_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -160,10 +1222,19 @@ class CyberpunkMPMasterServer:
                 timestamp REAL,
                 player_count INTEGER,
                 status TEXT,
+                end_time REAL,
+                heartbeats INTEGER DEFAULT 1,
                 FOREIGN KEY (server_id) REFERENCES servers (server_id)
             )
         ''')
 
+        # Upgrade databases from before run-length encoding: old rows are single samples
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(server_history)')]
+        if 'end_time' not in columns:
+            cursor.execute('ALTER TABLE server_history ADD COLUMN end_time REAL')
+            cursor.execute('ALTER TABLE server_history ADD COLUMN heartbeats INTEGER DEFAULT 1')
+            cursor.execute('UPDATE server_history SET end_time = timestamp, heartbeats = 1')
+
         # Create bans table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS bans (
@@ -176,39 +1247,81 @@ class CyberpunkMPMasterServer:
                 expires_at REAL -- NULL for permanent
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bans_target
+            ON bans (type, target)
+        ''')
+
+        # Indexes for time-range scans over history (exports, stats)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_server_history_timestamp
+            ON server_history (timestamp, id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_server_history_end_time
+            ON server_history (end_time)
+        ''')
 
         self.db.commit()
         logger.info("Database initialized successfully")
 
+    def load_bans(self):
+        """Load the active bans from the database into the in-memory ban lists"""
+        cursor = self.db.cursor()
+        cursor.execute('''
+            SELECT type, target, reason, expires_at
+            FROM bans
+            WHERE expires_at IS NULL OR expires_at > ?
+            ORDER BY banned_at
+        ''', (clock.time(),))
+
+        for ban_type, target, reason, expires_at in cursor.fetchall():
+            self.apply_ban(ban_type, target, reason, expires_at)
+
+        logger.info(f"Loaded {len(self.banned_servers)} server bans and {len(self.banned_players)} player bans")
+
     def setup_routes(self):
         """Setup HTTP routes"""
         # Server registration and heartbeat
         self.app.router.add_post('/announce', self.handle_server_announce)
+        self.app.router.add_post('/announce/batch', self.handle_server_announce_batch)
 
         # Server browser endpoints
         self.app.router.add_get('/servers', self.handle_get_servers)
         self.app.router.add_get('/list', self.handle_get_servers)  # Alias for launcher compatibility
         self.app.router.add_get('/servers/{server_id}', self.handle_get_server_details)
+        self.app.router.add_get('/icons/{content_hash}', self.handle_get_icon)
 
         # Statistics endpoints
         self.app.router.add_get('/stats', self.handle_get_stats)
         self.app.router.add_get('/stats/servers', self.handle_get_server_stats)
+        self.app.router.add_get('/stats/servers/export', self.handle_export_server_history)
         self.app.router.add_get('/stats/players', self.handle_get_player_stats)
+        self.app.router.add_get('/stats/players/unique', self.handle_get_unique_players)
+        self.app.router.add_get('/stats/leaderboard', self.handle_get_leaderboard)
+
+        # Player session reporting from game servers
+        self.app.router.add_post('/players/events', self.handle_player_events)
 
         # Admin endpoints
         self.app.router.add_post('/admin/ban', self.handle_ban)
         self.app.router.add_post('/admin/unban', self.handle_unban)
         self.app.router.add_get('/admin/bans', self.handle_get_bans)
+        self.app.router.add_post('/admin/bans/import', self.handle_import_bans)
+        self.app.router.add_get('/admin/bans/export', self.handle_export_bans)
 
         # Health check
         self.app.router.add_get('/health', self.handle_health_check)
+        self.app.router.add_get('/stats/admission', self.handle_get_admission_stats)
         self.app.router.add_get('/', self.handle_root)
 
         # CORS support
         self.app.router.add_options('/{path:.*}', self.handle_options)
 
-        # Middleware for CORS
+        # Middleware for CORS, then admission control
         self.app.middlewares.append(self.cors_middleware)
+        self.app.middlewares.append(self.handoff_middleware)
+        self.app.middlewares.append(self.admission_middleware)
 
         logger.info("Routes configured successfully")
 
@@ -228,6 +1341,51 @@ class CyberpunkMPMasterServer:
 
         return response
 
+    @web.middleware
+    async def handoff_middleware(self, request: Request, handler):
+        """Track the requests a reload must wait for or cut short, and refuse writes while it runs"""
+        bulk = self.get_route_class(request) == 'bulk'
+        write = request.method == 'POST'
+        if self.draining and (bulk or write):
+            response = web.json_response(
+                {'error': 'Server is reloading, retry shortly'},
+                status=503,
+                headers={'Retry-After': '1'}
+            )
+            # Reconnect to whichever process serves next
+            response.force_close()
+            return response
+
+        tracked = self.bulk_requests if bulk else self.write_requests if write else None
+        if tracked is None:
+            return await handler(request)
+
+        task = asyncio.current_task()
+        tracked.add(task)
+        try:
+            return await handler(request)
+        finally:
+            tracked.discard(task)
+
+    @web.middleware
+    async def admission_middleware(self, request: Request, handler):
+        """Bound concurrency per route class and shed reads under overload"""
+        route_class = self.get_route_class(request)
+        if route_class is None:
+            return await handler(request)
+
+        if not await self.admission.acquire(route_class):
+            return web.json_response(
+                {'error': 'Server overloaded, retry later'},
+                status=503,
+                headers={'Retry-After': str(ADMISSION_RETRY_AFTER)}
+            )
+
+        try:
+            return await handler(request)
+        finally:
+            self.admission.release(route_class)
+
     async def handle_options(self, request: Request) -> Response:
         """Handle CORS preflight requests"""
         return web.Response(
@@ -241,7 +1399,7 @@ class CyberpunkMPMasterServer:
 
     async def handle_root(self, request: Request) -> Response:
         """Root endpoint with server information"""
-        uptime = time.time() - self.stats['server_start_time']
+        uptime = clock.time() - self.stats['server_start_time']
         online_servers = len([s for s in self.servers.values() if s.is_online()])
 
         info = {
@@ -275,108 +1433,113 @@ class CyberpunkMPMasterServer:
             # Parse form data
             data = await request.post()
 
-            # Validate required fields
-            required_fields = ['name', 'port', 'version']
-            for field in required_fields:
-                if field not in data:
-                    return web.json_response({'error': f'Missing required field: {field}'}, status=400)
-
-            # Create server ID from IP and port
-            server_id = f"{client_ip}:{data['port']}"
-
-            # Extract and validate data
             try:
-                port = int(data['port'])
-                tick = int(data.get('tick', 60))
-                player_count = int(data.get('player_count', 0))
-                max_player_count = int(data.get('max_player_count', 10))
-                flags = int(data.get('flags', 0))
-                public = data.get('public', 'true').lower() == 'true'
-                password = data.get('pass', 'false').lower() == 'true'
+                announcement = self.parse_announcement(data)
             except ValueError as e:
-                return web.json_response({'error': f'Invalid numeric field: {e}'}, status=400)
-
-            # Validate port range
-            if not (1024 <= port <= 65535):
-                return web.json_response({'error': 'Port must be between 1024 and 65535'}, status=400)
-
-            # Validate player counts
-            if player_count < 0 or max_player_count < 1 or player_count > max_player_count:
-                return web.json_response({'error': 'Invalid player count values'}, status=400)
-
-            current_time = time.time()
-
-            # Check if this is a new server or update
-            is_new_server = server_id not in self.servers
-
-            if is_new_server:
-                # New server registration
-                server_info = ServerInfo(
-                    name=self.sanitize_string(data['name']),
-                    desc=self.sanitize_string(data.get('desc', '')),
-                    icon_url=self.sanitize_url(data.get('icon_url', '')),
-                    version=self.sanitize_string(data['version']),
-                    ip=client_ip,
-                    port=port,
-                    tick=tick,
-                    player_count=player_count,
-                    max_player_count=max_player_count,
-                    tags=self.sanitize_string(data.get('tags', '')),
-                    public=public,
-                    password=password,
-                    flags=flags,
-                    last_heartbeat=current_time,
-                    first_seen=current_time,
-                    region=self.detect_region(client_ip)
-                )
+                return web.json_response({'error': str(e)}, status=400)
 
-                self.stats['total_servers_registered'] += 1
-                logger.info(f"New server registered: {server_info.name} ({server_id})")
-            else:
-                # Update existing server
-                server_info = self.servers[server_id]
-                server_info.name = self.sanitize_string(data['name'])
-                server_info.desc = self.sanitize_string(data.get('desc', ''))
-                server_info.icon_url = self.sanitize_url(data.get('icon_url', ''))
-                server_info.version = self.sanitize_string(data['version'])
-                server_info.tick = tick
-                server_info.player_count = player_count
-                server_info.max_player_count = max_player_count
-                server_info.tags = self.sanitize_string(data.get('tags', ''))
-                server_info.public = public
-                server_info.password = password
-                server_info.flags = flags
-                server_info.last_heartbeat = current_time
-
-                # Update uptime
-                server_info.uptime_minutes = int((current_time - server_info.first_seen) / 60)
-
-            # Store server info
-            self.servers[server_id] = server_info
-
-            # Update statistics
-            self.stats['total_announcements'] += 1
-            online_servers = len([s for s in self.servers.values() if s.is_online()])
-            total_players = sum(s.player_count for s in self.servers.values() if s.is_online())
-
-            self.stats['peak_servers'] = max(self.stats['peak_servers'], online_servers)
-            self.stats['peak_players'] = max(self.stats['peak_players'], total_players)
-            self.stats['total_players_online'] = total_players
+            # Create server ID from IP and port
+            server_id = f"{client_ip}:{announcement['port']}"
+            if server_id in self.banned_servers:
+                logger.warning(f"Banned server attempted to announce: {server_id}")
+                return web.Response(status=403, text=f"Server banned: {self.banned_servers[server_id]}")
+
+            current_time = clock.time()
+            server_info = self.apply_announcement(client_ip, server_id, announcement, current_time)
+            self.update_online_stats()
 
             # Save to database
             await self.save_server_to_db(server_info)
 
             # Log server history
-            await self.log_server_history(server_id, player_count, 'online')
+            await self.log_server_history(server_id, server_info.player_count, 'online')
 
-            logger.debug(f"Server heartbeat: {server_info.name} ({player_count}/{max_player_count} players)")
+            logger.debug(f"Server heartbeat: {server_info.name} ({server_info.player_count}/{server_info.max_player_count} players)")
 
-            return web.json_response({'status': 'success', 'message': 'Server registered successfully'})
+            return web.json_response({
+                'status': 'success',
+                'message': 'Server registered successfully',
+                'next_announce_seconds': server_info.heartbeat_interval
+            })
 
         except Exception as e:
             logger.error(f"Error handling server announcement: {e}")
             return web.json_response({'error': 'Internal server error'}, status=500)
 
+    async def handle_server_announce_batch(self, request: Request) -> Response:
+        """Handle a batch of announcements from one host running many servers
+
+        Body: {"servers": [<announce fields>, ...]} or a bare JSON array. Every
+        entry is validated, ban and rate-limit checked on its own, then all
+        accepted entries are applied together and persisted in one transaction.
+        """
+        try:
+            client_ip = self.get_client_ip(request)
+
+            if client_ip in self.banned_servers:
+                logger.warning(f"Banned server attempted to announce: {client_ip}")
+                return web.Response(status=403, text=f"Server banned: {self.banned_servers[client_ip]}")
+
+            data = await request.json()
+            entries = data.get('servers') if isinstance(data, dict) else data
+            if not isinstance(entries, list):
+                return web.json_response({'error': 'Expected a list of servers'}, status=400)
+            if len(entries) > ANNOUNCE_BATCH_MAX_SIZE:
+                return web.json_response({'error': f'Too many servers (max {ANNOUNCE_BATCH_MAX_SIZE})'}, status=413)
+
+            current_time = clock.time()
+            results = []
+            accepted = {}  # Server ID -> parsed announcement
+
+            # Validate everything before touching the registry
+            for index, entry in enumerate(entries):
+                if not isinstance(entry, dict):
+                    results.append({'index': index, 'status': 'error', 'error': 'Entry must be an object'})
+                    continue
+
+                try:
+                    announcement = self.parse_announcement(entry)
+                except ValueError as e:
+                    results.append({'index': index, 'status': 'error', 'error': str(e)})
+                    continue
+
+                server_id = f"{client_ip}:{announcement['port']}"
+                result = {'index': index, 'server_id': server_id}
+
+                if server_id in self.banned_servers:
+                    result.update(status='banned', error=self.banned_servers[server_id])
+                elif server_id in accepted or self.is_announce_rate_limited(server_id, current_time):
+                    result.update(status='rate_limited', error='Announcing too often')
+                else:
+                    accepted[server_id] = announcement
+                    result['status'] = 'success'
+                results.append(result)
+
+            # Apply as one registry update (no awaits in between)
+            updated = []
+            for server_id, announcement in accepted.items():
+                updated.append(self.apply_announcement(client_ip, server_id, announcement, current_time))
+
+            for result in results:
+                if result['status'] == 'success':
+                    result['next_announce_seconds'] = self.servers[result['server_id']].heartbeat_interval
+            if updated:
+                self.update_online_stats()
+                await self.save_announcements_to_db(updated)
+
+            return web.json_response({
+                'status': 'success',
+                'accepted': len(updated),
+                'rejected': len(results) - len(updated),
+                'results': results
+            })
+
+        except json.JSONDecodeError:
+            return web.json_response({'error': 'Invalid JSON'}, status=400)
+        except Exception as e:
+            logger.error(f"Error handling batch announcement: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
     async def handle_get_servers(self, request: Request) -> Response:
         """Handle server list request"""
         try:
@@ -387,23 +1550,47 @@ class CyberpunkMPMasterServer:
             include_offline = params.get('include_offline', 'false').lower() == 'true'
             region_filter = params.get('region', '').strip()
             version_filter = params.get('version', '').strip()
+            tags_filter = parse_tags(params.get('tags', ''))
             has_players = params.get('has_players', 'false').lower() == 'true'
             public_only = params.get('public_only', 'true').lower() == 'true'
+            base_url = self.get_base_url(request)
+
+            # 'facets=true' requests every facet, or name them: 'facets=region,tags'
+            facets_param = params.get('facets', '').strip().lower()
+            if facets_param in ['', 'false']:
+                requested_facets = []
+            elif facets_param == 'true':
+                requested_facets = FacetIndex.FACETS
+            else:
+                requested_facets = [f for f in parse_tags(facets_param) if f in FacetIndex.FACETS]
+
+            # Narrow candidates with the facet sets before checking anything else
+            candidate_sets = []
+            if region_filter:
+                candidate_sets.append(self.facets.lookup('region', region_filter, case_sensitive=False))
+            if version_filter:
+                candidate_sets.append(self.facets.lookup('version', version_filter))
+            for tag in tags_filter:
+                candidate_sets.append(self.facets.lookup('tags', tag))
+
+            if candidate_sets:
+                candidate_sets.sort(key=len)
+                candidates = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+            else:
+                candidates = self.servers.keys()
 
             # Filter servers
             filtered_servers = []
-            current_time = time.time()
-
-            for server_id, server in self.servers.items():
-                # Check if server is online
-                if not include_offline and not server.is_online():
-                    continue
+            matched_ids = set()
+            current_time = clock.time()
 
-                # Apply filters
-                if region_filter and server.region.lower() != region_filter.lower():
+            for server_id in candidates:
+                server = self.servers.get(server_id)
+                if server is None:
                     continue
 
-                if version_filter and server.version != version_filter:
+                # Check if server is online
+                if not include_offline and not server.is_online():
                     continue
 
                 if has_players and server.player_count == 0:
@@ -412,9 +1599,10 @@ class CyberpunkMPMasterServer:
                 if public_only and not server.public:
                     continue
 
-                server_data = server.to_dict()
+                server_data = server.to_dict(base_url)
                 server_data['server_id'] = server_id
                 filtered_servers.append(server_data)
+                matched_ids.add(server_id)
 
             # Sort by player count (descending) then by name
             filtered_servers.sort(key=lambda x: (-x['player_count'], x['name']))
@@ -427,17 +1615,52 @@ class CyberpunkMPMasterServer:
                     'include_offline': include_offline,
                     'region': region_filter,
                     'version': version_filter,
+                    'tags': tags_filter,
                     'has_players': has_players,
                     'public_only': public_only
                 }
             }
 
+            if requested_facets:
+                response_data['facets'] = {
+                    facet: self.facets.count(facet, matched_ids) for facet in requested_facets
+                }
+
             return web.json_response(response_data)
 
         except Exception as e:
             logger.error(f"Error handling server list request: {e}")
             return web.json_response({'error': 'Internal server error'}, status=500)
 
+    async def handle_get_icon(self, request: Request) -> Response:
+        """Serve a cached server icon by content hash"""
+        try:
+            content_hash = request.match_info['content_hash'].split('.')[0]
+            if content_hash not in self.icons.entries:
+                return web.json_response({'error': 'Icon not found'}, status=404)
+
+            # Content-addressed, so the hash is a strong validator forever
+            etag = f'"{content_hash}"'
+            headers = {
+                'ETag': etag,
+                'Cache-Control': f'public, max-age={ICON_CACHE_MAX_AGE}, immutable'
+            }
+            self.icons.touch(content_hash)
+
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                return web.Response(status=304, headers=headers)
+
+            path = self.icons.get_path(content_hash)
+            body = await asyncio.get_running_loop().run_in_executor(None, self.read_file, path)
+
+            return web.Response(body=body, content_type=self.icons.entries[content_hash][0], headers=headers)
+
+        except FileNotFoundError:
+            return web.json_response({'error': 'Icon not found'}, status=404)
+        except Exception as e:
+            logger.error(f"Error handling icon request: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
     async def handle_get_server_details(self, request: Request) -> Response:
         """Handle individual server details request"""
         try:
@@ -447,7 +1670,7 @@ class CyberpunkMPMasterServer:
                 return web.json_response({'error': 'Server not found'}, status=404)
 
             server = self.servers[server_id]
-            server_data = server.to_dict()
+            server_data = server.to_dict(self.get_base_url(request))
             server_data['server_id'] = server_id
 
             # Add additional details
@@ -464,7 +1687,7 @@ class CyberpunkMPMasterServer:
     async def handle_get_stats(self, request: Request) -> Response:
         """Handle master server statistics request"""
         try:
-            current_time = time.time()
+            current_time = clock.time()
             uptime = current_time - self.stats['server_start_time']
 
             online_servers = [s for s in self.servers.values() if s.is_online()]
@@ -507,27 +1730,26 @@ class CyberpunkMPMasterServer:
     async def handle_get_server_stats(self, request: Request) -> Response:
         """Handle detailed server statistics"""
         try:
-            # Get server history from database
+            since = clock.time() - 86400  # Last 24 hours
+            max_samples = 1000
+
+            # Get server history runs from database, newest first
             cursor = self.db.cursor()
             cursor.execute('''
-                SELECT server_id, timestamp, player_count, status
+                SELECT id, server_id, timestamp, end_time, heartbeats, player_count, status
                 FROM server_history
-                WHERE timestamp > ?
-                ORDER BY timestamp DESC
-                LIMIT 1000
-            ''', (time.time() - 86400,))  # Last 24 hours
-
-            history = cursor.fetchall()
+                WHERE end_time > ?
+                ORDER BY end_time DESC
+            ''', (since,))
 
-            # Process history data
+            # Merge the runs back into the most recent samples across all servers
             server_history = {}
-            for server_id, timestamp, player_count, status in history:
-                if server_id not in server_history:
-                    server_history[server_id] = []
-                server_history[server_id].append({
+            samples = self.merge_history_runs(iter(cursor), descending=True, since=since)
+            for timestamp, run in itertools.islice(samples, max_samples):
+                server_history.setdefault(run[1], []).append({
                     'timestamp': int(timestamp),
-                    'player_count': player_count,
-                    'status': status
+                    'player_count': run[5],
+                    'status': run[6]
                 })
 
             return web.json_response({
@@ -539,18 +1761,112 @@ class CyberpunkMPMasterServer:
             logger.error(f"Error handling server stats request: {e}")
             return web.json_response({'error': 'Internal server error'}, status=500)
 
+    async def handle_export_server_history(self, request: Request) -> web.StreamResponse:
+        """Handle streaming server history export for offline analytics
+
+        Query parameters: 'since'/'until' (unix time), 'server_id' (repeatable),
+        'format' ('ndjson' or 'csv'), 'gzip' ('true' to compress on the fly) and
+        'intervals' ('true' for raw runs instead of expanded samples). Runs are
+        read in (start, id) order with keyset pagination and samples are merged
+        into timestamp order, so memory use stays flat regardless of export size.
+        """
+        params = request.query
+        export_format = params.get('format', 'ndjson').lower()
+        if export_format not in ['ndjson', 'csv']:
+            return web.json_response({'error': 'Invalid format'}, status=400)
+
+        try:
+            since = float(params.get('since', 0))
+            until = float(params['until']) if 'until' in params else None
+        except ValueError as e:
+            return web.json_response({'error': f'Invalid time range: {e}'}, status=400)
+
+        intervals = params.get('intervals', 'false').lower() == 'true'
+        server_ids = [sid.strip() for sid in params.getall('server_id', []) if sid.strip()]
+
+        # Build the static part of the filter once
+        filters = ['end_time >= ?']
+        filter_args = [since]
+        if until is not None:
+            filters.append('timestamp < ?')
+            filter_args.append(until)
+        if server_ids:
+            filters.append(f"server_id IN ({', '.join('?' * len(server_ids))})")
+            filter_args.extend(server_ids)
+        extra_filter = ''.join(f' AND {f}' for f in filters)
+
+        if export_format == 'csv':
+            content_type = 'text/csv'
+        else:
+            content_type = 'application/x-ndjson'
+
+        response = web.StreamResponse(headers={
+            'Content-Type': content_type,
+            'Content-Disposition': f'attachment; filename="server_history.{export_format}"'
+        })
+        if params.get('gzip', 'false').lower() == 'true':
+            response.enable_compression(web.ContentCoding.gzip)
+        await response.prepare(request)
+
+        try:
+            if export_format == 'csv':
+                if intervals:
+                    await response.write(b'server_id,start_time,end_time,heartbeats,player_count,status\r\n')
+                else:
+                    await response.write(b'server_id,timestamp,player_count,status\r\n')
+
+            # Queries, merging and encoding run in a worker thread on a
+            # connection of their own, one chunk at a time
+            export_db = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+            try:
+                runs = self.iter_history_runs(export_db, since, extra_filter, filter_args)
+                if intervals:
+                    records = (self.history_run_to_record(run) for run in runs)
+                else:
+                    records = (
+                        self.history_sample_to_record(timestamp, run)
+                        for timestamp, run in self.merge_history_runs(runs, since=since, until=until)
+                    )
+
+                def encode_chunk() -> bytes:
+                    chunk = list(itertools.islice(records, HISTORY_EXPORT_CHUNK_SIZE))
+                    return self.format_history_records(chunk, export_format) if chunk else b''
+
+                loop = asyncio.get_running_loop()
+                pending = None
+                while True:
+                    pending = loop.run_in_executor(None, encode_chunk)
+                    body = await asyncio.shield(pending)
+                    if not body:
+                        break
+                    await response.write(body)
+            finally:
+                # A reload cancels exports; let the worker finish with the
+                # connection before closing it
+                if pending is not None and not pending.done():
+                    await asyncio.wait([pending])
+                export_db.close()
+
+        except Exception as e:
+            # Headers are already sent, so all we can do is cut the stream short
+            logger.error(f"Error handling server history export: {e}")
+
+        await response.write_eof()
+        return response
+
     async def handle_get_player_stats(self, request: Request) -> Response:
         """Handle player statistics request"""
         try:
-            # This would be populated by game servers reporting player data
-            # For now, return aggregate data
             online_servers = [s for s in self.servers.values() if s.is_online()]
+            today = self.get_day_key(clock.time())
 
             stats = {
                 'total_players_online': sum(s.player_count for s in online_servers),
                 'average_players_per_server': round(sum(s.player_count for s in online_servers) / max(len(online_servers), 1), 2),
                 'servers_with_players': len([s for s in online_servers if s.player_count > 0]),
-                'most_populated_server': max(online_servers, key=lambda s: s.player_count).to_dict() if online_servers else None
+                'most_populated_server': self.get_most_populated_server(self.get_base_url(request)),
+                'active_sessions': sum(len(sessions) for sessions in self.player_sessions.values()),
+                'unique_players_today': self.estimate_unique_players('global', '', today)
             }
 
             return web.json_response(stats)
@@ -559,6 +1875,143 @@ class CyberpunkMPMasterServer:
             logger.error(f"Error handling player stats request: {e}")
             return web.json_response({'error': 'Internal server error'}, status=500)
 
+    async def handle_get_leaderboard(self, request: Request) -> Response:
+        """Handle server leaderboard request
+
+        Boards are maintained incrementally, so this only reads the cached top entries.
+        """
+        try:
+            params = request.query
+            board_filter = params.get('board', '').strip()
+            try:
+                limit = min(max(int(params.get('limit', LEADERBOARD_SIZE)), 1), LEADERBOARD_SIZE)
+            except ValueError:
+                return web.json_response({'error': 'Invalid limit'}, status=400)
+
+            if board_filter and board_filter not in ServerLeaderboards.BOARDS:
+                return web.json_response({'error': 'Invalid board'}, status=400)
+
+            boards = [board_filter] if board_filter else ServerLeaderboards.BOARDS
+            leaderboards = {}
+            for board in boards:
+                entries = []
+                for score, server_id in self.leaderboards.get_top(board, limit):
+                    server = self.servers.get(server_id)
+                    entries.append({
+                        'server_id': server_id,
+                        'name': server.name if server else None,
+                        'score': round(score, 2)
+                    })
+                leaderboards[board] = entries
+
+            return web.json_response({
+                'leaderboards': leaderboards,
+                'timestamp': int(clock.time())
+            })
+
+        except Exception as e:
+            logger.error(f"Error handling leaderboard request: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
+    async def handle_get_unique_players(self, request: Request) -> Response:
+        """Handle approximate unique player count request"""
+        try:
+            params = request.query
+            day = params.get('day', '').strip() or self.get_day_key(clock.time())
+            server_id = params.get('server_id', '').strip()
+            region = params.get('region', '').strip()
+
+            if server_id:
+                scope, key = 'server', server_id
+            elif region:
+                scope, key = 'region', region
+            else:
+                scope, key = 'global', ''
+
+            return web.json_response({
+                'day': day,
+                'scope': scope,
+                'key': key,
+                'unique_players': self.estimate_unique_players(scope, key, day),
+                'approximate': True
+            })
+
+        except Exception as e:
+            logger.error(f"Error handling unique players request: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
+    async def handle_player_events(self, request: Request) -> Response:
+        """Handle batched player join/leave events reported by a game server
+
+        Body: {"port": <server port>, "events": [{"type": "join"|"leave",
+        "player_id": ..., "player_name": ..., "timestamp": ...}, ...]}
+        Sessions are aggregated in memory and flushed to player_stats periodically.
+        """
+        try:
+            client_ip = self.get_client_ip(request)
+
+            if client_ip in self.banned_servers:
+                logger.warning(f"Banned server attempted to report players: {client_ip}")
+                return web.Response(status=403, text=f"Server banned: {self.banned_servers[client_ip]}")
+
+            data = await request.json()
+            if not isinstance(data, dict):
+                return web.json_response({'error': 'Invalid request body'}, status=400)
+
+            try:
+                port = int(data.get('port'))
+            except (TypeError, ValueError):
+                return web.json_response({'error': 'Missing or invalid port'}, status=400)
+
+            server_id = f"{client_ip}:{port}"
+            server = self.servers.get(server_id)
+            if server is None:
+                return web.json_response({'error': 'Server not registered'}, status=404)
+
+            events = data.get('events')
+            if not isinstance(events, list):
+                return web.json_response({'error': 'Missing events list'}, status=400)
+            if len(events) > PLAYER_EVENTS_MAX_BATCH:
+                return web.json_response({'error': f'Too many events (max {PLAYER_EVENTS_MAX_BATCH})'}, status=413)
+
+            current_time = clock.time()
+            accepted = 0
+            rejected = 0
+
+            for event in events:
+                if not isinstance(event, dict):
+                    rejected += 1
+                    continue
+
+                event_type = event.get('type')
+                player_id = self.sanitize_string(str(event.get('player_id') or ''), 64)
+                if event_type not in ['join', 'leave'] or not player_id or player_id in self.banned_players:
+                    rejected += 1
+                    continue
+
+                # Trust the reporter's timestamp only within a sane window
+                try:
+                    timestamp = float(event.get('timestamp', current_time))
+                except (TypeError, ValueError):
+                    timestamp = current_time
+                timestamp = min(max(timestamp, current_time - PLAYER_EVENT_MAX_AGE), current_time)
+
+                player_name = self.sanitize_string(str(event.get('player_name') or ''), 64) or None
+
+                if event_type == 'join':
+                    self.start_player_session(server, server_id, player_id, player_name, timestamp)
+                else:
+                    self.end_player_session(server.region, server_id, player_id, player_name, timestamp)
+                accepted += 1
+
+            return web.json_response({'status': 'success', 'accepted': accepted, 'rejected': rejected})
+
+        except json.JSONDecodeError:
+            return web.json_response({'error': 'Invalid JSON'}, status=400)
+        except Exception as e:
+            logger.error(f"Error handling player events: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
     async def handle_ban(self, request: Request) -> Response:
         """Handle ban request (admin endpoint)"""
         try:
@@ -578,25 +2031,14 @@ class CyberpunkMPMasterServer:
             # Calculate expiry time
             expires_at = None
             if duration:
-                expires_at = time.time() + (duration * 60)
+                expires_at = clock.time() + (duration * 60)
 
-            # Store ban
-            cursor = self.db.cursor()
-            cursor.execute('''
-                INSERT INTO bans (type, target, reason, banned_at, expires_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (ban_type, target, reason, time.time(), expires_at))
-            self.db.commit()
+            # Store ban, replacing any active ban of the same target
+            with self.db:
+                self.write_bans([(ban_type, target, reason, clock.time(), 'system', expires_at)])
 
             # Apply ban
-            if ban_type == 'server':
-                self.banned_servers[target] = reason
-                # Remove banned server from active list
-                to_remove = [sid for sid, s in self.servers.items() if s.ip == target]
-                for sid in to_remove:
-                    del self.servers[sid]
-            else:
-                self.banned_players[target] = reason
+            self.apply_ban(ban_type, target, reason, expires_at)
 
             logger.info(f"Banned {ban_type}: {target} - {reason}")
 
@@ -618,16 +2060,13 @@ class CyberpunkMPMasterServer:
                 return web.json_response({'error': 'Missing type or target'}, status=400)
 
             # Remove from active bans
-            if ban_type == 'server' and target in self.banned_servers:
-                del self.banned_servers[target]
-            elif ban_type == 'player' and target in self.banned_players:
-                del self.banned_players[target]
+            self.lift_ban(ban_type, target)
 
             # Mark as unbanned in database
             cursor = self.db.cursor()
             cursor.execute('''
                 UPDATE bans SET expires_at = ? WHERE type = ? AND target = ? AND (expires_at IS NULL OR expires_at > ?)
-            ''', (time.time(), ban_type, target, time.time()))
+            ''', (clock.time(), ban_type, target, clock.time()))
             self.db.commit()
 
             logger.info(f"Unbanned {ban_type}: {target}")
@@ -647,7 +2086,7 @@ class CyberpunkMPMasterServer:
                 FROM bans
                 WHERE expires_at IS NULL OR expires_at > ?
                 ORDER BY banned_at DESC
-            ''', (time.time(),))
+            ''', (clock.time(),))
 
             bans = []
             for ban_type, target, reason, banned_at, expires_at in cursor.fetchall():
@@ -666,9 +2105,167 @@ class CyberpunkMPMasterServer:
             logger.error(f"Error handling get bans request: {e}")
             return web.json_response({'error': 'Internal server error'}, status=500)
 
+    async def handle_import_bans(self, request: Request) -> Response:
+        """Handle bulk NDJSON ban import (admin endpoint)
+
+        Each line is a JSON object with 'type', 'target' and optional 'reason',
+        'duration' (minutes) or 'expires_at' (unix time). Lines are streamed from
+        the request body and applied in batched transactions.
+        """
+        try:
+            imported = 0
+            skipped = 0
+            errors = []
+            batch = []
+            line_number = 0
+
+            async for raw_line in self.read_body_lines(request, BAN_IMPORT_MAX_LINE):
+                line_number += 1
+                if raw_line is None:
+                    skipped += 1
+                    if len(errors) < BAN_IMPORT_MAX_ERRORS:
+                        errors.append({'line': line_number, 'error': f'Line longer than {BAN_IMPORT_MAX_LINE} bytes'})
+                    continue
+
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                try:
+                    entry = self.parse_ban_entry(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    skipped += 1
+                    if len(errors) < BAN_IMPORT_MAX_ERRORS:
+                        errors.append({'line': line_number, 'error': str(e)})
+                    continue
+
+                if entry is None:
+                    # Already expired
+                    skipped += 1
+                    continue
+
+                batch.append(entry)
+                if len(batch) >= BAN_IMPORT_BATCH_SIZE:
+                    imported += self.import_ban_batch(batch)
+                    batch = []
+                    # Let other requests run between transactions
+                    await asyncio.sleep(0)
+
+            if batch:
+                imported += self.import_ban_batch(batch)
+
+            logger.info(f"Imported {imported} bans ({skipped} skipped)")
+
+            return web.json_response({
+                'status': 'success',
+                'imported': imported,
+                'skipped': skipped,
+                'errors': errors
+            })
+
+        except Exception as e:
+            logger.error(f"Error handling ban import request: {e}")
+            return web.json_response({'error': 'Internal server error'}, status=500)
+
+    async def read_body_lines(self, request: Request, max_length: int):
+        """Yield the lines of a request body, or None for each line over max_length
+
+        Overlong lines are discarded as they stream in rather than buffered.
+        """
+        buffer = bytearray()
+        overlong = False
+        while True:
+            chunk = await request.content.read(65536)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+
+            start = 0
+            while True:
+                end = buffer.find(b'\n', start)
+                if end < 0:
+                    break
+                if overlong or end - start > max_length:
+                    overlong = False
+                    yield None
+                else:
+                    yield bytes(buffer[start:end])
+                start = end + 1
+            del buffer[:start]
+
+            if len(buffer) > max_length:
+                overlong = True
+                buffer.clear()
+
+        if overlong or len(buffer) > max_length:
+            yield None
+        elif buffer:
+            yield bytes(buffer)
+
+    async def handle_export_bans(self, request: Request) -> web.StreamResponse:
+        """Handle bulk NDJSON ban export (admin endpoint)
+
+        Active bans are read in id order using keyset pagination, so the export
+        never holds more than one chunk in memory.
+        """
+        include_expired = request.query.get('include_expired', 'false').lower() == 'true'
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+
+        try:
+            last_id = 0
+            while True:
+                cursor = self.db.cursor()
+                if include_expired:
+                    cursor.execute('''
+                        SELECT id, type, target, reason, banned_at, banned_by, expires_at
+                        FROM bans
+                        WHERE id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    ''', (last_id, BAN_EXPORT_CHUNK_SIZE))
+                else:
+                    cursor.execute('''
+                        SELECT id, type, target, reason, banned_at, banned_by, expires_at
+                        FROM bans
+                        WHERE id > ? AND (expires_at IS NULL OR expires_at > ?)
+                        ORDER BY id
+                        LIMIT ?
+                    ''', (last_id, clock.time(), BAN_EXPORT_CHUNK_SIZE))
+
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                lines = []
+                for ban_id, ban_type, target, reason, banned_at, banned_by, expires_at in rows:
+                    lines.append(json.dumps({
+                        'type': ban_type,
+                        'target': target,
+                        'reason': reason,
+                        'banned_at': int(banned_at) if banned_at else None,
+                        'banned_by': banned_by,
+                        'expires_at': int(expires_at) if expires_at else None
+                    }))
+                await response.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+                last_id = rows[-1][0]
+
+        except Exception as e:
+            # Headers are already sent, so all we can do is cut the stream short
+            logger.error(f"Error handling ban export request: {e}")
+
+        await response.write_eof()
+        return response
+
+    async def handle_get_admission_stats(self, request: Request) -> Response:
+        """Handle admission control statistics request"""
+        return web.json_response(self.admission.get_stats())
+
     async def handle_health_check(self, request: Request) -> Response:
         """Health check endpoint"""
-        uptime = time.time() - self.stats['server_start_time']
+        uptime = clock.time() - self.stats['server_start_time']
         online_servers = len([s for s in self.servers.values() if s.is_online()])
 
         health = {
@@ -676,7 +2273,9 @@ class CyberpunkMPMasterServer:
             'uptime_seconds': int(uptime),
             'online_servers': online_servers,
             'database_ok': True,
-            'timestamp': int(time.time())
+            'timestamp': int(clock.time()),
+            'loop_lag_ms': round(self.admission.loop_lag * 1000, 2),
+            'logging': get_logging_stats()
         }
 
         # Test database connection
@@ -692,6 +2291,19 @@ class CyberpunkMPMasterServer:
 
     # Helper methods
 
+    def get_route_class(self, request: Request) -> Optional[str]:
+        """Get the admission class of a request, or None to bypass admission"""
+        path = request.path
+        if request.method == 'OPTIONS' or path in ['/', '/health', '/stats/admission']:
+            return None
+        if path.startswith('/announce') or path == '/players/events':
+            return 'announce'
+        if path.endswith('/export') or path.endswith('/import'):
+            return 'bulk'
+        if path.startswith('/admin'):
+            return 'admin'
+        return 'read'
+
     def get_client_ip(self, request: Request) -> str:
         """Get the real client IP address"""
         # Check for forwarded headers first
@@ -751,6 +2363,587 @@ class CyberpunkMPMasterServer:
         except:
             return 'Unknown'
 
+    def history_run_length(self, run: tuple) -> int:
+        """Get the number of heartbeat samples in a server_history run"""
+        _, _, start_time, end_time, heartbeats = run[:5]
+        if not heartbeats or heartbeats <= 1 or end_time is None or end_time <= start_time:
+            return 1
+        return heartbeats
+
+    def history_sample_time(self, run: tuple, index: int) -> float:
+        """Get the timestamp of one heartbeat in a run, assuming they were evenly spaced"""
+        _, _, start_time, end_time, heartbeats = run[:5]
+        if index == 0 or self.history_run_length(run) == 1:
+            return start_time
+        return start_time + index * (end_time - start_time) / (heartbeats - 1)
+
+    def clip_history_run(self, run: tuple, since: Optional[float], until: Optional[float]) -> tuple:
+        """Get the (first, last) sample indexes of a run inside [since, until)"""
+        length = self.history_run_length(run)
+        first, last = 0, length - 1
+        start_time = run[2]
+        step = (run[3] - start_time) / (length - 1) if length > 1 else 0.0
+
+        if since is not None and since > start_time and step:
+            first = min(max(math.ceil((since - start_time) / step) - 1, 0), length)
+        if until is not None and step:
+            last = min(max(math.ceil((until - start_time) / step), 0), length - 1)
+
+        # The estimates can be one off either way with float rounding
+        while first < length and since is not None and self.history_sample_time(run, first) < since:
+            first += 1
+        while last >= 0 and until is not None and self.history_sample_time(run, last) >= until:
+            last -= 1
+        return first, last
+
+    def iter_history_runs(self, db: sqlite3.Connection, since: float, extra_filter: str,
+                          filter_args: List[Any]) -> Iterator[tuple]:
+        """Read server_history runs in (start, id) order with keyset pagination"""
+        # Start the keyset at the earliest run still open at 'since'
+        row = db.execute('SELECT MIN(timestamp) FROM server_history WHERE end_time >= ?', (since,)).fetchone()
+        if row[0] is None:
+            return
+
+        # Keyset cursor: rows strictly after (last_timestamp, last_id)
+        last_timestamp = row[0]
+        last_id = -1
+        while True:
+            rows = db.execute(f'''
+                SELECT id, server_id, timestamp, end_time, heartbeats, player_count, status
+                FROM server_history
+                WHERE (timestamp, id) > (?, ?){extra_filter}
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', (last_timestamp, last_id, *filter_args, HISTORY_EXPORT_CHUNK_SIZE)).fetchall()
+
+            if not rows:
+                return
+            yield from rows
+
+            last_id = rows[-1][0]
+            last_timestamp = rows[-1][2]
+
+    def merge_history_runs(self, runs: Iterator[tuple], descending: bool = False,
+                           since: Optional[float] = None, until: Optional[float] = None) -> Iterator[tuple]:
+        """Expand server_history runs into (timestamp, run) samples in time order
+
+        Runs must arrive ordered by their first sample in the same direction:
+        by start time, or by end time when descending. Samples outside
+        [since, until) are skipped without being generated, and the heap only
+        holds a (run, index) cursor for each run overlapping the merge point.
+        """
+        sign = -1 if descending else 1
+        heap = []
+        sequence = 0
+        pending = next(runs, None)
+
+        while True:
+            # Admit every run whose first sample comes before the next one out
+            while pending is not None and (not heap or sign * pending[3 if descending else 2] <= heap[0][0]):
+                first, last = self.clip_history_run(pending, since, until)
+                if first <= last:
+                    index, stop = (last, first) if descending else (first, last)
+                    timestamp = self.history_sample_time(pending, index)
+                    heapq.heappush(heap, (sign * timestamp, sequence, index, stop, pending))
+                    sequence += 1
+                pending = next(runs, None)
+
+            if not heap:
+                return
+
+            key, run_sequence, index, stop, run = heapq.heappop(heap)
+            yield sign * key, run
+            if index != stop:
+                index += sign
+                heapq.heappush(heap, (sign * self.history_sample_time(run, index), run_sequence, index, stop, run))
+
+    def history_run_to_record(self, run: tuple) -> Dict[str, Any]:
+        """Convert a server_history run to an export record"""
+        _, server_id, start_time, end_time, heartbeats, player_count, status = run
+        return {
+            'server_id': server_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'heartbeats': heartbeats,
+            'player_count': player_count,
+            'status': status
+        }
+
+    def history_sample_to_record(self, timestamp: float, run: tuple) -> Dict[str, Any]:
+        """Convert one expanded sample of a server_history run to an export record"""
+        return {
+            'server_id': run[1],
+            'timestamp': timestamp,
+            'player_count': run[5],
+            'status': run[6]
+        }
+
+    def format_history_records(self, records: List[Dict[str, Any]], export_format: str) -> bytes:
+        """Encode a chunk of server_history export records"""
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for record in records:
+                writer.writerow(record.values())
+            return buffer.getvalue().encode('utf-8')
+
+        return ('\n'.join(json.dumps(record) for record in records) + '\n').encode('utf-8')
+
+    def parse_announcement(self, data) -> Dict[str, Any]:
+        """Validate announce fields, raising ValueError with a client-facing message"""
+        # Validate required fields
+        required_fields = ['name', 'port', 'version']
+        for field_name in required_fields:
+            if field_name not in data:
+                raise ValueError(f'Missing required field: {field_name}')
+
+        # Extract and validate data
+        try:
+            port = int(data['port'])
+            tick = int(data.get('tick', 60))
+            player_count = int(data.get('player_count', 0))
+            max_player_count = int(data.get('max_player_count', 10))
+            flags = int(data.get('flags', 0))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid numeric field: {e}')
+
+        # Validate port range
+        if not (1024 <= port <= 65535):
+            raise ValueError('Port must be between 1024 and 65535')
+
+        # Validate player counts
+        if player_count < 0 or max_player_count < 1 or player_count > max_player_count:
+            raise ValueError('Invalid player count values')
+
+        tags = self.sanitize_string(str(data.get('tags', '')))
+
+        return {
+            'name': self.sanitize_string(str(data['name'])),
+            'desc': self.sanitize_string(str(data.get('desc', ''))),
+            'icon_url': self.sanitize_url(str(data.get('icon_url', ''))),
+            'version': self.sanitize_string(str(data['version'])),
+            'port': port,
+            'tick': tick,
+            'player_count': player_count,
+            'max_player_count': max_player_count,
+            'tags': tags,
+            'tag_list': parse_tags(tags),
+            'public': str(data.get('public', 'true')).lower() == 'true',
+            'password': str(data.get('pass', 'false')).lower() == 'true',
+            'flags': flags
+        }
+
+    def apply_announcement(self, client_ip: str, server_id: str, announcement: Dict[str, Any],
+                           current_time: float) -> ServerInfo:
+        """Create or update a registry entry from a validated announcement"""
+        server_info = self.servers.get(server_id)
+
+        if server_info is None:
+            # New server registration
+            server_info = ServerInfo(
+                ip=client_ip,
+                last_heartbeat=current_time,
+                first_seen=current_time,
+                region=self.detect_region(client_ip),
+                **announcement
+            )
+
+            self.stats['total_servers_registered'] += 1
+            logger.info(f"New server registered: {server_info.name} ({server_id})")
+        else:
+            # Update existing server
+            for key, value in announcement.items():
+                setattr(server_info, key, value)
+            server_info.last_heartbeat = current_time
+
+            # Update uptime
+            server_info.uptime_minutes = int((current_time - server_info.first_seen) / 60)
+
+        # Point at the local icon copy, fetching it in the background if needed
+        content_hash = self.icons.lookup(server_info.icon_url)
+        if content_hash:
+            server_info.cached_icon_url = self.get_icon_url(content_hash)
+        else:
+            server_info.cached_icon_url = ''
+            self.icons.request(server_info.icon_url)
+
+        # Store server info
+        self.servers[server_id] = server_info
+        self.facets.update(server_id, server_info)
+        self.leaderboards.record_announce(server_id, server_info.player_count, current_time)
+        server_info.heartbeat_interval = self.get_heartbeat_interval(server_id)
+        self.stats['total_announcements'] += 1
+
+        return server_info
+
+    def get_heartbeat_interval(self, server_id: str) -> int:
+        """Recommend the next announce interval for a server
+
+        Servers whose player count is changing fast are asked to announce
+        sooner, and the whole fleet is slowed down while the master is loaded.
+        """
+        trend = self.leaderboards.trends.get(server_id)
+        change_rate = abs(trend.growth_rate) if trend else 0.0
+        interval = HEARTBEAT_DEFAULT_INTERVAL / (1 + change_rate / HEARTBEAT_CHANGE_SCALE)
+
+        # Load from event loop lag and announce slot usage, capped at doubling
+        announce_class = self.admission.classes['announce']
+        load = max(
+            self.admission.loop_lag / LOOP_LAG_SHED_THRESHOLD,
+            (announce_class.active + len(announce_class.waiters)) / announce_class.max_concurrency
+        )
+        interval *= 1 + min(load, 1.0)
+
+        return int(min(max(interval, HEARTBEAT_MIN_INTERVAL), HEARTBEAT_MAX_INTERVAL))
+
+    def update_online_stats(self):
+        """Refresh current and peak online counters"""
+        online_servers = len([s for s in self.servers.values() if s.is_online()])
+        total_players = sum(s.player_count for s in self.servers.values() if s.is_online())
+
+        self.stats['peak_servers'] = max(self.stats['peak_servers'], online_servers)
+        self.stats['peak_players'] = max(self.stats['peak_players'], total_players)
+        self.stats['total_players_online'] = total_players
+
+    def is_announce_rate_limited(self, server_id: str, current_time: float) -> bool:
+        """Check if a server announced again sooner than allowed"""
+        server = self.servers.get(server_id)
+        return server is not None and current_time - server.last_heartbeat < ANNOUNCE_MIN_INTERVAL
+
+    def get_most_populated_server(self, base_url: str = '') -> Optional[Dict[str, Any]]:
+        """Get the online server with the most players from the leaderboard"""
+        for _, server_id in self.leaderboards.get_top('players', LEADERBOARD_SIZE):
+            server = self.servers.get(server_id)
+            if server and server.is_online():
+                return server.to_dict(base_url)
+
+        # Every cached leader went offline since the last refresh
+        online_servers = [s for s in self.servers.values() if s.is_online()]
+        return max(online_servers, key=lambda s: s.player_count).to_dict(base_url) if online_servers else None
+
+    async def leaderboard_task(self):
+        """Background leaderboard window expiry task"""
+        while True:
+            try:
+                await clock.sleep(LEADERBOARD_REFRESH_INTERVAL)
+                online_ids = {sid for sid, s in self.servers.items() if s.is_online()}
+                self.leaderboards.refresh(online_ids, clock.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in leaderboard task: {e}")
+
+    def get_day_key(self, timestamp: float) -> str:
+        """Get the UTC day bucket for a timestamp"""
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+    def estimate_unique_players(self, scope: str, key: str, day: str) -> int:
+        """Estimate unique players for a scope ('global', 'region' or 'server') and day"""
+        sketch = self.unique_player_sketches.get((scope, key, day))
+        return sketch.count() if sketch else 0
+
+    def record_unique_player(self, server: ServerInfo, server_id: str, player_id: str, timestamp: float):
+        """Add a player to the global, per-region and per-server sketches for the day"""
+        day = self.get_day_key(timestamp)
+        for scope, key in (('global', ''), ('region', server.region), ('server', server_id)):
+            sketch = self.unique_player_sketches.get((scope, key, day))
+            if sketch is None:
+                precision = UNIQUE_PLAYER_SERVER_SKETCH_PRECISION if scope == 'server' else UNIQUE_PLAYER_SKETCH_PRECISION
+                sketch = self.unique_player_sketches[(scope, key, day)] = HyperLogLog(precision)
+            sketch.add(player_id)
+
+    def get_pending_player_stats(self, player_id: str, player_name: Optional[str],
+                                 region: Optional[str], timestamp: float) -> PendingPlayerStats:
+        """Get or create the unflushed stats entry for a player"""
+        pending = self.pending_player_stats.get(player_id)
+        if pending is None:
+            pending = self.pending_player_stats[player_id] = PendingPlayerStats(
+                player_name=player_name,
+                first_seen=timestamp,
+                last_seen=timestamp,
+                region=region or 'Unknown'
+            )
+        else:
+            if player_name:
+                pending.player_name = player_name
+            pending.first_seen = min(pending.first_seen, timestamp)
+            pending.last_seen = max(pending.last_seen, timestamp)
+            if region:
+                pending.region = region
+        return pending
+
+    def start_player_session(self, server: ServerInfo, server_id: str, player_id: str,
+                             player_name: Optional[str], timestamp: float):
+        """Record a player joining a server"""
+        sessions = self.player_sessions.setdefault(server_id, {})
+        # A repeated join keeps the original session start
+        sessions.setdefault(player_id, timestamp)
+
+        pending = self.get_pending_player_stats(player_id, player_name, server.region, timestamp)
+        pending.servers.add(server_id)
+        self.record_unique_player(server, server_id, player_id, timestamp)
+
+    def end_player_session(self, region: Optional[str], server_id: str, player_id: str,
+                           player_name: Optional[str], timestamp: float):
+        """Record a player leaving a server and credit the session's playtime"""
+        sessions = self.player_sessions.get(server_id, {})
+        started_at = sessions.pop(player_id, None)
+        if not sessions:
+            self.player_sessions.pop(server_id, None)
+
+        pending = self.get_pending_player_stats(player_id, player_name, region, timestamp)
+        pending.servers.add(server_id)
+        if started_at is not None:
+            pending.playtime_minutes += max(int(round((timestamp - started_at) / 60)), 0)
+
+    def close_server_sessions(self, server_id: str, region: Optional[str], timestamp: float):
+        """End every open session on a server that went away"""
+        for player_id in list(self.player_sessions.get(server_id, {})):
+            self.end_player_session(region, server_id, player_id, None, timestamp)
+
+    async def flush_player_stats(self):
+        """Write accumulated player statistics to player_stats in one batch"""
+        current_time = clock.time()
+
+        # Sessions on servers removed by bans etc. end now
+        for server_id in [sid for sid in self.player_sessions if sid not in self.servers]:
+            self.close_server_sessions(server_id, None, current_time)
+
+        # Credit whole minutes of open sessions so long sessions show up before they end
+        for server_id, sessions in self.player_sessions.items():
+            region = self.servers[server_id].region
+            for player_id, started_at in sessions.items():
+                minutes = int((current_time - started_at) // 60)
+                if minutes > 0:
+                    pending = self.get_pending_player_stats(player_id, None, region, current_time)
+                    pending.playtime_minutes += minutes
+                    sessions[player_id] = started_at + minutes * 60
+
+        if not self.pending_player_stats:
+            return
+
+        pending_stats = self.pending_player_stats
+        self.pending_player_stats = {}
+
+        try:
+            # servers_played is a comma separated list, oldest first, so merge
+            # with what is stored and keep only the most recent servers
+            player_ids = list(pending_stats)
+            stored_servers = {}
+            cursor = self.db.cursor()
+            for offset in range(0, len(player_ids), 500):
+                chunk = player_ids[offset:offset + 500]
+                cursor.execute(f'''
+                    SELECT player_id, servers_played FROM player_stats
+                    WHERE player_id IN ({', '.join('?' * len(chunk))})
+                ''', chunk)
+                for player_id, servers_played in cursor.fetchall():
+                    stored_servers[player_id] = [s for s in (servers_played or '').split(',') if s]
+
+            rows = []
+            for player_id, pending in pending_stats.items():
+                servers = [s for s in stored_servers.get(player_id, []) if s not in pending.servers]
+                servers.extend(sorted(pending.servers))
+                rows.append((
+                    player_id, pending.player_name, pending.first_seen, pending.last_seen,
+                    pending.playtime_minutes, ','.join(servers[-PLAYER_SERVERS_PLAYED_MAX:]), pending.region
+                ))
+
+            with self.db:
+                self.db.executemany('''
+                    INSERT INTO player_stats (
+                        player_id, player_name, first_seen, last_seen,
+                        total_playtime_minutes, servers_played, region
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(player_id) DO UPDATE SET
+                        player_name = COALESCE(excluded.player_name, player_name),
+                        first_seen = MIN(first_seen, excluded.first_seen),
+                        last_seen = MAX(last_seen, excluded.last_seen),
+                        total_playtime_minutes = total_playtime_minutes + excluded.total_playtime_minutes,
+                        servers_played = excluded.servers_played,
+                        region = excluded.region
+                ''', rows)
+
+            logger.debug(f"Flushed stats for {len(rows)} players")
+        except Exception as e:
+            logger.error(f"Error flushing player stats: {e}")
+            # Keep the data for the next attempt
+            for player_id, pending in pending_stats.items():
+                current = self.pending_player_stats.get(player_id)
+                if current is None:
+                    self.pending_player_stats[player_id] = pending
+                else:
+                    current.playtime_minutes += pending.playtime_minutes
+                    current.servers |= pending.servers
+                    current.first_seen = min(current.first_seen, pending.first_seen)
+                    current.player_name = current.player_name or pending.player_name
+
+        # Drop sketches that fell out of the retention window
+        oldest_day = self.get_day_key(current_time - UNIQUE_PLAYER_SKETCH_DAYS * 86400)
+        for sketch_key in [k for k in self.unique_player_sketches if k[2] < oldest_day]:
+            del self.unique_player_sketches[sketch_key]
+
+    async def player_stats_task(self):
+        """Background player statistics flush task"""
+        while True:
+            try:
+                await clock.sleep(PLAYER_STATS_FLUSH_INTERVAL)
+                await self.flush_player_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in player stats task: {e}")
+
+    def read_file(self, path: str) -> bytes:
+        """Read a whole file (runs in a worker thread)"""
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def get_base_url(self, request: Request) -> str:
+        """Get the base URL clients reached this server on"""
+        return self.public_url or f"{request.scheme}://{request.host}"
+
+    def get_icon_url(self, content_hash: str) -> str:
+        """Get the URL of a cached icon (a path when no public URL is configured)"""
+        return f"{self.public_url}/icons/{content_hash}"
+
+    def on_icon_cached(self, url: str, content_hash: str):
+        """Point every server using a newly cached icon at the local copy"""
+        cached_url = self.get_icon_url(content_hash)
+        for server in self.servers.values():
+            if server.icon_url == url:
+                server.cached_icon_url = cached_url
+
+    def on_icon_evicted(self, content_hash: str):
+        """Fall back to the source URL for servers whose icon was evicted"""
+        cached_url = self.get_icon_url(content_hash)
+        for server in self.servers.values():
+            if server.cached_icon_url == cached_url:
+                server.cached_icon_url = ''
+
+    def remove_server(self, server_id: str) -> ServerInfo:
+        """Remove a server from the registry and every index built on it"""
+        server = self.servers.pop(server_id)
+        self.history_runs.pop(server_id, None)
+
+        # Per-server unique player sketches go with the server
+        current_time = clock.time()
+        for days_ago in range(UNIQUE_PLAYER_SKETCH_DAYS + 1):
+            day = self.get_day_key(current_time - days_ago * 86400)
+            self.unique_player_sketches.pop(('server', server_id, day), None)
+        self.facets.remove(server_id)
+        self.leaderboards.remove_server(server_id)
+        return server
+
+    def apply_ban(self, ban_type: str, target: str, reason: str, expires_at: Optional[float] = None):
+        """Apply a ban to the in-memory ban lists"""
+        if expires_at is not None:
+            self.ban_expiry[(ban_type, target)] = expires_at
+        else:
+            self.ban_expiry.pop((ban_type, target), None)
+
+        if ban_type == 'server':
+            self.banned_servers[target] = reason
+            # Remove banned server from active list
+            to_remove = [sid for sid, s in self.servers.items() if s.ip == target or sid == target]
+            for sid in to_remove:
+                self.remove_server(sid)
+        else:
+            self.banned_players[target] = reason
+
+    def lift_ban(self, ban_type: str, target: str):
+        """Remove a ban from the in-memory ban lists"""
+        self.ban_expiry.pop((ban_type, target), None)
+        if ban_type == 'server':
+            self.banned_servers.pop(target, None)
+        elif ban_type == 'player':
+            self.banned_players.pop(target, None)
+
+    def expire_bans(self, current_time: float):
+        """Lift temporary bans whose expiry has passed"""
+        expired = [key for key, expires_at in self.ban_expiry.items() if expires_at <= current_time]
+        for ban_type, target in expired:
+            logger.info(f"Ban expired for {ban_type}: {target}")
+            self.lift_ban(ban_type, target)
+
+    def write_bans(self, rows: List[tuple]):
+        """Upsert bans rows, updating the active ban of a (type, target) instead of adding another
+
+        Call inside a transaction.
+        """
+        cursor = self.db.cursor()
+        for ban_type, target, reason, banned_at, banned_by, expires_at in rows:
+            cursor.execute('''
+                UPDATE bans SET reason = ?, banned_at = ?, banned_by = ?, expires_at = ?
+                WHERE type = ? AND target = ? AND (expires_at IS NULL OR expires_at > ?)
+            ''', (reason, banned_at, banned_by, expires_at, ban_type, target, banned_at))
+            if cursor.rowcount == 0:
+                cursor.execute('''
+                    INSERT INTO bans (type, target, reason, banned_at, banned_by, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (ban_type, target, reason, banned_at, banned_by, expires_at))
+
+    def parse_ban_entry(self, data: Any) -> Optional[tuple]:
+        """Validate one imported ban, returning a bans row or None if already expired"""
+        if not isinstance(data, dict):
+            raise ValueError('Ban entry must be a JSON object')
+
+        ban_type = data.get('type')
+        target = data.get('target')
+        if ban_type not in ['server', 'player']:
+            raise ValueError('Invalid ban type')
+        if not target or not isinstance(target, str):
+            raise ValueError('Missing type or target')
+
+        current_time = clock.time()
+        reason = str(data.get('reason') or 'No reason provided')
+        banned_by = str(data.get('banned_by') or 'import')
+
+        expires_at = data.get('expires_at')
+        duration = data.get('duration')
+        if expires_at is not None:
+            expires_at = float(expires_at)
+        elif duration:
+            expires_at = current_time + float(duration) * 60
+
+        if expires_at is not None and expires_at <= current_time:
+            return None
+
+        return (ban_type, target.strip(), reason, current_time, banned_by, expires_at)
+
+    def import_ban_batch(self, batch: List[tuple]) -> int:
+        """Write a batch of bans in one transaction, then apply them in memory"""
+        # A target listed twice in one batch keeps its last entry
+        batch = list({(row[0], row[1]): row for row in batch}.values())
+        try:
+            with self.db:
+                self.write_bans(batch)
+        except Exception as e:
+            logger.error(f"Error importing ban batch: {e}")
+            return 0
+
+        # No awaits here, so handlers never see a partially applied batch
+        server_bans = {}
+        for ban_type, target, reason, _, _, expires_at in batch:
+            if expires_at is not None:
+                self.ban_expiry[(ban_type, target)] = expires_at
+            else:
+                self.ban_expiry.pop((ban_type, target), None)
+
+            if ban_type == 'server':
+                server_bans[target] = reason
+            else:
+                self.banned_players[target] = reason
+
+        if server_bans:
+            self.banned_servers.update(server_bans)
+            # One pass over the active list instead of one per ban
+            to_remove = [sid for sid, s in self.servers.items() if s.ip in server_bans or sid in server_bans]
+            for sid in to_remove:
+                self.remove_server(sid)
+
+        return len(batch)
+
     def get_region_stats(self, servers: List[ServerInfo]) -> Dict[str, int]:
         """Get server count by region"""
         regions = {}
@@ -767,6 +2960,17 @@ class CyberpunkMPMasterServer:
             versions[version] = versions.get(version, 0) + 1
         return versions
 
+    def server_to_row(self, server: ServerInfo) -> tuple:
+        """Build a servers table row"""
+        return (
+            f"{server.ip}:{server.port}",
+            server.name, server.desc, server.icon_url, server.version,
+            server.ip, server.port, server.tick, server.max_player_count,
+            server.tags, int(server.public), int(server.password),
+            server.flags, server.first_seen, server.last_heartbeat,
+            server.region
+        )
+
     async def save_server_to_db(self, server: ServerInfo):
         """Save server information to database"""
         try:
@@ -779,44 +2983,81 @@ class CyberpunkMPMasterServer:
                     tick_rate, max_players, tags, public, password_protected,
                     flags, first_seen, last_seen, region
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"{server.ip}:{server.port}",
-                server.name, server.desc, server.icon_url, server.version,
-                server.ip, server.port, server.tick, server.max_player_count,
-                server.tags, int(server.public), int(server.password),
-                server.flags, server.first_seen, server.last_heartbeat,
-                server.region
-            ))
+            ''', self.server_to_row(server))
 
             self.db.commit()
         except Exception as e:
             logger.error(f"Error saving server to database: {e}")
 
+    async def save_announcements_to_db(self, servers: List[ServerInfo]):
+        """Save a batch of announced servers and their history in one transaction"""
+        try:
+            current_time = clock.time()
+            with self.db:
+                self.db.executemany('''
+                    REPLACE INTO servers (
+                        server_id, name, description, icon_url, version, ip, port,
+                        tick_rate, max_players, tags, public, password_protected,
+                        flags, first_seen, last_seen, region
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [self.server_to_row(server) for server in servers])
+
+                cursor = self.db.cursor()
+                for server in servers:
+                    self.record_history(cursor, f"{server.ip}:{server.port}", server.player_count, 'online', current_time)
+        except Exception as e:
+            logger.error(f"Error saving announcement batch to database: {e}")
+
+    def record_history(self, cursor: sqlite3.Cursor, server_id: str, player_count: int, status: str, timestamp: float):
+        """Extend the server's open history run in place, or start a new run if anything changed"""
+        run = self.history_runs.get(server_id)
+        server = self.servers.get(server_id)
+        max_gap = server.get_liveness_window() if server else HEARTBEAT_DEFAULT_INTERVAL * HEARTBEAT_LIVENESS_MULTIPLIER
+
+        # Runs also end at UTC midnight, which bounds how long any one row spans
+        if (run is not None and len(run) > 4 and run[1] == player_count and run[2] == status
+                and timestamp - run[3] <= max_gap and int(run[4] // 86400) == int(timestamp // 86400)):
+            cursor.execute('''
+                UPDATE server_history SET end_time = ?, heartbeats = heartbeats + 1 WHERE id = ?
+            ''', (timestamp, run[0]))
+            run[3] = timestamp
+            return
+
+        cursor.execute('''
+            INSERT INTO server_history (server_id, timestamp, end_time, heartbeats, player_count, status)
+            VALUES (?, ?, ?, 1, ?, ?)
+        ''', (server_id, timestamp, timestamp, player_count, status))
+
+        # Only heartbeats extend runs; a timeout closes the server's run
+        if status == 'online':
+            self.history_runs[server_id] = [cursor.lastrowid, player_count, status, timestamp, timestamp]
+        else:
+            self.history_runs.pop(server_id, None)
+
     async def log_server_history(self, server_id: str, player_count: int, status: str):
         """Log server history for analytics"""
         try:
             cursor = self.db.cursor()
-            cursor.execute('''
-                INSERT INTO server_history (server_id, timestamp, player_count, status)
-                VALUES (?, ?, ?, ?)
-            ''', (server_id, time.time(), player_count, status))
+            self.record_history(cursor, server_id, player_count, status, clock.time())
             self.db.commit()
         except Exception as e:
             logger.error(f"Error logging server history: {e}")
 
     async def cleanup_old_servers(self):
-        """Remove servers that haven't sent heartbeats in a while"""
-        current_time = time.time()
-        timeout = 10 * 60  # 10 minutes
+        """Remove servers that haven't sent heartbeats in a while, and lift expired bans"""
+        current_time = clock.time()
+        self.expire_bans(current_time)
 
+        # Twice the server's own liveness window (10 minutes at the default interval)
         to_remove = []
         for server_id, server in self.servers.items():
-            if current_time - server.last_heartbeat > timeout:
+            if current_time - server.last_heartbeat > 2 * server.get_liveness_window():
                 to_remove.append(server_id)
 
         for server_id in to_remove:
             logger.info(f"Removing inactive server: {server_id}")
-            del self.servers[server_id]
+            server = self.remove_server(server_id)
+            self.close_server_sessions(server_id, server.region, server.last_heartbeat)
             await self.log_server_history(server_id, 0, 'timeout')
 
     async def cleanup_task(self):
@@ -824,23 +3065,197 @@ class CyberpunkMPMasterServer:
         while True:
             try:
                 await self.cleanup_old_servers()
-                await asyncio.sleep(300)  # Run every 5 minutes
+                await clock.sleep(300)  # Run every 5 minutes
             except Exception as e:
                 logger.error(f"Error in cleanup task: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                await clock.sleep(60)  # Wait 1 minute on error
+
+    def save_snapshot(self, path: str):
+        """Write the in-memory registry and counters to a snapshot file (bans live in the database)"""
+        snapshot = {
+            'saved_at': clock.time(),
+            'servers': {sid: asdict(server) for sid, server in self.servers.items()},
+            'stats': self.stats,
+            'player_sessions': self.player_sessions,
+            'history_runs': self.history_runs,
+            'unique_player_sketches': [
+                {'scope': scope, 'key': key, 'day': day, **sketch.to_dict()}
+                for (scope, key, day), sketch in self.unique_player_sketches.items()
+            ]
+        }
 
-    async def start(self):
-        """Start the master server"""
-        # Start cleanup task
-        cleanup_task = asyncio.create_task(self.cleanup_task())
+        # Write then rename so a reader never sees a partial snapshot
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+        logger.info(f"Saved snapshot of {len(self.servers)} servers to {path}")
+
+    def load_snapshot(self, path: str):
+        """Restore in-memory state from a snapshot written by a previous process"""
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+
+        # Ignore fields renamed or removed since the snapshot was written
+        known_fields = {f.name for f in fields(ServerInfo)}
+        self.servers = {}
+        for sid, data in snapshot['servers'].items():
+            try:
+                self.servers[sid] = ServerInfo(**{k: v for k, v in data.items() if k in known_fields})
+            except TypeError as e:
+                logger.warning(f"Skipping server {sid} from snapshot: {e}")
+        self.stats.update(snapshot['stats'])
+        self.player_sessions = snapshot['player_sessions']
+        self.history_runs = snapshot.get('history_runs', {})
+
+        for entry in snapshot['unique_player_sketches']:
+            sketch = HyperLogLog.from_dict(entry)
+            self.unique_player_sketches[(entry['scope'], entry['key'], entry['day'])] = sketch
+
+        # Leaderboard windows restart, but current scores are known immediately
+        for server_id, server in self.servers.items():
+            self.facets.update(server_id, server)
+            self.leaderboards.record_announce(server_id, server.player_count, server.last_heartbeat)
+
+        logger.info(f"Loaded snapshot of {len(self.servers)} servers from {path}")
+
+    async def handoff(self, sock: socket.socket) -> bool:
+        """Start a successor process on our listening socket
+
+        Call with serving and background tasks stopped, so the snapshot is the
+        final state. Returns True once the successor is serving.
+        """
+        await self.flush_player_stats()
+        self.save_snapshot(SNAPSHOT_PATH)
+
+        ready_read, ready_write = os.pipe()
+        cmd = [
+            sys.executable, os.path.abspath(__file__),
+            '--host', self.host,
+            '--port', str(self.port),
+            '--inherit-fd', str(sock.fileno()),
+            '--ready-fd', str(ready_write),
+            '--snapshot', SNAPSHOT_PATH,
+            '--log-format', _log_format
+        ]
+        if self.public_url:
+            cmd.extend(['--public-url', self.public_url])
+        if self.icons.allow_private_hosts:
+            cmd.append('--allow-private-icon-hosts')
+        if isinstance(clock, VirtualClock):
+            # Carry on the simulation from the same simulated moment
+            cmd.extend(['--simulate', repr(clock.speed), '--simulate-start', repr(clock.time())])
+        if logging.getLogger().level == logging.DEBUG:
+            cmd.append('--debug')
+        if self.pid_file:
+            cmd.extend(['--pid-file', self.pid_file])
 
         try:
+            successor = subprocess.Popen(cmd, pass_fds=(sock.fileno(), ready_write))
+        except Exception as e:
+            logger.error(f"Failed to start successor process: {e}")
+            os.close(ready_read)
+            os.close(ready_write)
+            return False
+        os.close(ready_write)
+
+        # The successor writes one byte once it is serving
+        loop = asyncio.get_running_loop()
+        try:
+            ready = await asyncio.wait_for(
+                loop.run_in_executor(None, os.read, ready_read, 1), HANDOFF_READY_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            ready = b''
+        finally:
+            os.close(ready_read)
+
+        if not ready:
+            logger.error("Successor did not become ready, continuing to serve")
+            successor.kill()
+            return False
+
+        logger.info(f"Successor process {successor.pid} is serving, exiting")
+        return True
+
+    def start_background_tasks(self) -> List[asyncio.Task]:
+        """Start the background maintenance tasks"""
+        return [
+            asyncio.create_task(self.cleanup_task()),
+            asyncio.create_task(self.player_stats_task()),
+            asyncio.create_task(self.leaderboard_task()),
+            asyncio.create_task(self.admission.monitor_loop_lag()),
+            asyncio.create_task(clock.run())
+        ]
+
+    async def stop_background_tasks(self, tasks: List[asyncio.Task]):
+        """Cancel background tasks and wait for them to finish"""
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve(self, sock: socket.socket) -> web.AppRunner:
+        """Start serving HTTP on the listening socket"""
+        runner = web.AppRunner(self.app, shutdown_timeout=HANDOFF_DRAIN_TIMEOUT)
+        await runner.setup()
+
+        # Serve a duplicate so stopping the site leaves the listening socket
+        # open, and connections queue in its backlog for whoever serves next
+        site = web.SockSite(runner, sock.dup())
+        await site.start()
+        return runner
+
+    async def drain_for_handoff(self, runner: web.AppRunner):
+        """Stop accepting, cut bulk transfers short and let in-flight writes land"""
+        self.draining = True
+
+        # Only closes the listener; requests already running carry on
+        for site in list(runner.sites):
+            await site.stop()
+
+        # Exports and imports can run for minutes; clients resume them with since
+        for task in list(self.bulk_requests):
+            task.cancel()
+
+        pending = list(self.write_requests | self.bulk_requests)
+        if pending:
+            await asyncio.wait(pending, timeout=HANDOFF_WRITE_TIMEOUT)
+
+    async def start(self, inherit_fd: Optional[int] = None, ready_fd: Optional[int] = None,
+                    snapshot_path: Optional[str] = None, pid_file: Optional[str] = None):
+        """Start the master server
+
+        With inherit_fd the listening socket is taken over from a previous
+        process, which is signalled through ready_fd once we are serving.
+        """
+        self.pid_file = pid_file
+        if snapshot_path:
+            try:
+                self.load_snapshot(snapshot_path)
+                os.remove(snapshot_path)
+            except Exception as e:
+                logger.error(f"Error loading snapshot: {e}")
+
+        # Start background tasks
+        tasks = self.start_background_tasks()
+
+        try:
+            # Own the listening socket so it can be handed to a successor
+            if inherit_fd is not None:
+                sock = socket.socket(fileno=inherit_fd)
+            else:
+                sock = socket.create_server((self.host, self.port))
+
             # Create and start web server
-            runner = web.AppRunner(self.app)
-            await runner.setup()
+            runner = await self.serve(sock)
 
-            site = web.TCPSite(runner, self.host, self.port)
-            await site.start()
+            if pid_file:
+                with open(pid_file, 'w') as f:
+                    f.write(str(os.getpid()))
+            if ready_fd is not None:
+                os.write(ready_fd, b'1')
+                os.close(ready_fd)
 
             logger.info(f"CyberpunkMP Master Server started on http://{self.host}:{self.port}")
             logger.info("Available endpoints:")
@@ -850,18 +3265,55 @@ class CyberpunkMPMasterServer:
             logger.info("  GET  /stats      - Master server statistics")
             logger.info("  GET  /health     - Health check")
 
+            # SIGHUP starts a graceful reload (POSIX only)
+            stop_event = asyncio.Event()
+            reload_lock = asyncio.Lock()
+
+            async def reload():
+                nonlocal runner, tasks
+                if reload_lock.locked():
+                    return
+                async with reload_lock:
+                    if isinstance(clock, VirtualClock) and not clock.speed:
+                        logger.warning("Reload is not supported on a manually advanced virtual clock")
+                        return
+
+                    # Nothing may change state after the snapshot, but reads
+                    # still in flight are drained once the successor serves
+                    await self.drain_for_handoff(runner)
+                    await self.stop_background_tasks(tasks)
+
+                    if await self.handoff(sock):
+                        self.handed_off = True
+                        stop_event.set()
+                        return
+
+                    await runner.cleanup()
+                    self.draining = False
+                    runner = await self.serve(sock)
+                    tasks = self.start_background_tasks()
+
+            if hasattr(signal, 'SIGHUP'):
+                asyncio.get_running_loop().add_signal_handler(
+                    signal.SIGHUP, lambda: asyncio.create_task(reload())
+                )
+
             # Keep the server running
             try:
-                await asyncio.Future()  # Run forever
-            except KeyboardInterrupt:
+                await stop_event.wait()
                 logger.info("Shutting down...")
             finally:
-                cleanup_task.cancel()
+                await self.stop_background_tasks(tasks)
+                await self.icons.close()
+                # Stops accepting, then waits for in-flight requests
                 await runner.cleanup()
+                # After a handoff the successor owns the sessions from the snapshot
+                if not self.handed_off:
+                    await self.flush_player_stats()
 
         except Exception as e:
             logger.error(f"Error starting server: {e}")
-            cleanup_task.cancel()
+            await self.stop_background_tasks(tasks)
             raise
 
 def main():
@@ -872,23 +3324,40 @@ def main():
     parser.add_argument('--host', default='127.0.0.1', help='Host to bind to (default: 127.0.0.1)')
     parser.add_argument('--port', type=int, default=8000, help='Port to bind to (default: 8000)')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    parser.add_argument('--log-format', choices=['json', 'text'], default='json', help='Log output format (default: json)')
+    parser.add_argument('--pid-file', help='Write the serving process ID to this file')
+    parser.add_argument('--public-url', help='Base URL launchers use to reach this server, for cached icon links (default: the Host of each request)')
+    parser.add_argument('--allow-private-icon-hosts', action='store_true', help='Allow fetching icons from private/loopback addresses (local testing only)')
+    parser.add_argument('--simulate', type=float, metavar='SPEED', help='Run on a virtual clock at SPEED simulated seconds per real second (benchmarking only)')
+    # Used internally by graceful reload (SIGHUP)
+    parser.add_argument('--inherit-fd', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ready-fd', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot', help=argparse.SUPPRESS)
+    parser.add_argument('--simulate-start', type=float, help=argparse.SUPPRESS)
 
     args = parser.parse_args()
 
-    if args.debug:
-        logging.getLogger().setLevel(logging.DEBUG)
+    configure_logging(logging.DEBUG if args.debug else logging.INFO, args.log_format)
+
+    if args.simulate:
+        set_clock(VirtualClock(start=args.simulate_start, speed=args.simulate))
+        logger.warning(f"Simulation mode: time runs at {args.simulate}x real time")
 
     # Create and start server
-    master_server = CyberpunkMPMasterServer(args.host, args.port)
+    icon_cache = IconCache(allow_private_hosts=args.allow_private_icon_hosts)
+    master_server = CyberpunkMPMasterServer(args.host, args.port, args.public_url, icon_cache)
 
     try:
-        asyncio.run(master_server.start())
+        asyncio.run(master_server.start(args.inherit_fd, args.ready_fd, args.snapshot, args.pid_file))
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
         logger.error(f"Server error: {e}")
         return 1
 
+    if master_server.handed_off:
+        return HANDOFF_EXIT_CODE
+
     return 0
 
 if __name__ == '__main__':
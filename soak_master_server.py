@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+CyberpunkMP Master Server Soak Test
+Drives the master server through simulated days of announces, churn, bans and
+queries on an accelerated clock, and fails if memory or database size grows
+faster than the configured per-hour budgets
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+import cyberpunkmp_master_server as master
+
+def get_rss_kb():
+    """Get the current resident set size in KB (0 if unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+        # Peak rather than current outside Linux, still useful as a ceiling
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    except ImportError:
+        return 0
+
+def get_db_size_kb(path):
+    """Get the on-disk database size in KB, including any WAL file"""
+    total = 0
+    for suffix in ['', '-wal', '-journal']:
+        if os.path.exists(path + suffix):
+            total += os.path.getsize(path + suffix)
+    return total // 1024
+
+def growth_per_hour(samples, key):
+    """Least squares slope of a sampled value per simulated hour"""
+    xs = [s['hour'] for s in samples]
+    ys = [s[key] for s in samples]
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+class SoakTest:
+    """Simulated fleet driving a master server instance"""
+
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.clock = master.VirtualClock()
+        self.fleet = {}  # Server ID -> (IP, port)
+        self.next_server = 0
+        self.online_players = {}  # Server ID -> set of player IDs
+        self.next_ban = 0
+        self.samples = []
+        self.baseline = None
+
+    def add_server(self):
+        """Bring a new simulated server online"""
+        index = self.next_server
+        self.next_server += 1
+        ip = f"100.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+        port = 7777 + index % 100
+        server_id = f"{ip}:{port}"
+        self.fleet[server_id] = (ip, port)
+        self.online_players[server_id] = set()
+
+    def churn(self):
+        """Replace a share of the fleet with new servers"""
+        leaving = self.random.sample(sorted(self.fleet), int(len(self.fleet) * self.args.churn))
+        for server_id in leaving:
+            del self.fleet[server_id]
+            del self.online_players[server_id]
+            self.add_server()
+
+    async def announce_round(self, client):
+        """Announce every server and report player joins/leaves"""
+        for server_id, (ip, port) in list(self.fleet.items()):
+            headers = {'X-Forwarded-For': ip}
+            players = self.online_players[server_id]
+
+            events = []
+            for player_id in list(players):
+                if self.random.random() < 0.1:
+                    players.discard(player_id)
+                    events.append({'type': 'leave', 'player_id': player_id})
+            while len(players) < 32 and self.random.random() < 0.3:
+                player_id = f"player-{self.random.randrange(self.args.player_pool)}"
+                players.add(player_id)
+                events.append({'type': 'join', 'player_id': player_id, 'player_name': player_id})
+
+            response = await client.post('/announce', headers=headers, data={
+                'name': f"Soak {server_id}",
+                'desc': 'Soak test server',
+                'version': 'v0.1',
+                'port': str(port),
+                'player_count': str(len(players)),
+                'max_player_count': '32',
+                'tags': self.random.choice(['pvp,rp', 'pve', 'rp', 'race,pvp'])
+            })
+            response.release()
+
+            if events:
+                response = await client.post('/players/events', headers=headers,
+                                             json={'port': port, 'events': events})
+                response.release()
+
+    async def ban_round(self, client):
+        """Ban and unban a few targets"""
+        for _ in range(self.args.bans_per_hour):
+            self.next_ban += 1
+            ban_type = self.random.choice(['server', 'player'])
+            target = f"203.0.{(self.next_ban >> 8) & 255}.{self.next_ban & 255}" if ban_type == 'server' else f"griefer-{self.next_ban}"
+            response = await client.post('/admin/ban', json={
+                'type': ban_type,
+                'target': target,
+                'reason': 'soak test',
+                'duration': self.random.choice([None, 30, 240])
+            })
+            response.release()
+
+            if self.random.random() < 0.3:
+                response = await client.post('/admin/unban', json={'type': ban_type, 'target': target})
+                response.release()
+
+    async def query_round(self, client):
+        """Hit the read endpoints like launchers and dashboards do"""
+        for path in ['/servers?facets=true', '/list', '/stats', '/stats/players', '/stats/leaderboard', '/health']:
+            response = await client.get(path)
+            await response.read()
+
+    def take_snapshot(self):
+        """Snapshot the traced heap, leaving out tracemalloc's own bookkeeping"""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<unknown>')
+        ])
+
+    def take_sample(self, server, hour):
+        """Record memory and database size"""
+        snapshot = self.take_snapshot()
+        sample = {
+            'hour': hour,
+            'heap_kb': sum(stat.size for stat in snapshot.statistics('filename')) // 1024,
+            'rss_kb': get_rss_kb(),
+            'db_kb': get_db_size_kb('cyberpunkmp_master.db'),
+            'servers': len(server.servers),
+            'bans': len(server.banned_servers) + len(server.banned_players)
+        }
+        self.samples.append(sample)
+
+        # Only the warm-up snapshot is kept; each holds every live trace
+        if hour == self.args.warmup_hours:
+            self.baseline = snapshot
+
+        print(f"  hour {hour:4d}: heap {sample['heap_kb']:8d} KB  rss {sample['rss_kb']:8d} KB  "
+              f"db {sample['db_kb']:8d} KB  servers {sample['servers']:5d}  bans {sample['bans']:6d}")
+
+    async def run(self):
+        """Run the simulation and check growth budgets"""
+        master.set_clock(self.clock)
+        server = master.CyberpunkMPMasterServer()
+        # Background tasks run for real, woken by the virtual clock as it advances
+        tasks = [
+            asyncio.create_task(server.cleanup_task()),
+            asyncio.create_task(server.player_stats_task()),
+            asyncio.create_task(server.leaderboard_task())
+        ]
+        test_server = TestServer(server.app)
+        await test_server.start_server()
+        # A plain session, since the test client keeps every response alive
+        client = ClientSession(base_url=str(test_server.make_url('/')))
+
+        for _ in range(self.args.servers):
+            self.add_server()
+
+        tracemalloc.start()
+        total_hours = int(self.args.days * 24)
+        minutes_per_round = self.args.announce_interval / 60
+
+        try:
+            self.take_sample(server, 0)
+            for hour in range(1, total_hours + 1):
+                minute = 0.0
+                while minute < 60:
+                    await self.announce_round(client)
+                    if int(minute) % 5 == 0:
+                        await self.query_round(client)
+
+                    await self.clock.advance(self.args.announce_interval)
+                    minute += minutes_per_round
+
+                self.churn()
+                await self.ban_round(client)
+                self.take_sample(server, hour)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            master.set_clock(master.CoarseClock())
+            await client.close()
+            await test_server.close()
+            server.db.close()
+
+        return self.check_budgets()
+
+    def check_budgets(self):
+        """Compare per-hour growth after warm-up against the budgets"""
+        measured = [s for s in self.samples if s['hour'] >= self.args.warmup_hours]
+        budgets = {
+            'heap_kb': self.args.max_heap_growth,
+            'rss_kb': self.args.max_rss_growth,
+            'db_kb': self.args.max_db_growth
+        }
+
+        print()
+        print("Growth per simulated hour (after warm-up):")
+        failed = False
+        for key, budget in budgets.items():
+            growth = growth_per_hour(measured, key)
+            status = 'OK' if growth <= budget else 'FAIL'
+            failed = failed or status == 'FAIL'
+            print(f"  {key:8s} {growth:10.1f} KB/h  (budget {budget} KB/h)  {status}")
+
+        if self.baseline is not None:
+            print()
+            print("Largest heap growth since warm-up:")
+            for stat in self.take_snapshot().compare_to(self.baseline, 'lineno')[:10]:
+                print(f"  {stat}")
+
+        return not failed
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='CyberpunkMP Master Server soak test')
+    parser.add_argument('--days', type=float, default=1, help='Simulated days to run (default: 1)')
+    parser.add_argument('--servers', type=int, default=20, help='Simulated fleet size (default: 20)')
+    parser.add_argument('--announce-interval', type=int, default=60, help='Simulated seconds between announces (default: 60)')
+    parser.add_argument('--churn', type=float, default=0.1, help='Share of the fleet replaced each hour (default: 0.1)')
+    parser.add_argument('--bans-per-hour', type=int, default=5, help='Bans issued each simulated hour (default: 5)')
+    parser.add_argument('--player-pool', type=int, default=100000, help='Distinct player IDs to draw from (default: 100000)')
+    parser.add_argument('--warmup-hours', type=int, default=2, help='Hours excluded from growth checks (default: 2)')
+    parser.add_argument('--max-heap-growth', type=float, default=256, help='Heap growth budget in KB per hour (default: 256)')
+    parser.add_argument('--max-rss-growth', type=float, default=1024, help='RSS growth budget in KB per hour (default: 1024)')
+    parser.add_argument('--max-db-growth', type=float, default=1024, help='Database growth budget in KB per hour (default: 1024)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    print("CyberpunkMP Master Server Soak Test")
+    print("=" * 40)
+    print(f"  Simulated days: {args.days}")
+    print(f"  Fleet size: {args.servers}")
+    print()
+
+    # The master server keeps its database in the working directory
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        master.configure_logging(master.logging.WARNING, 'text')
+        started = time.time()
+        try:
+            passed = asyncio.run(SoakTest(args).run())
+        finally:
+            os.chdir(original_dir)
+        print()
+        print(f"Finished in {time.time() - started:.1f}s: {'PASS' if passed else 'FAIL'}")
+
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    exit(main())
@@ -8,6 +8,11 @@ import sys
 import os
 import subprocess
 import platform
+import time
+
+# Exit status the master server uses after handing its socket to a successor
+HANDOFF_EXIT_CODE = 75
+PID_FILE = 'cyberpunkmp_master.pid'
 
 def check_python_version():
     """Check if Python 3.9+ is available"""
@@ -28,6 +33,32 @@ def install_requirements():
         print(f"ERROR: Failed to install requirements: {e}")
         return False
 
+def is_process_running(pid):
+    """Check if a process with the given PID is alive"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def wait_for_successor():
+    """Wait for a master server started by a graceful reload to exit"""
+    while True:
+        try:
+            with open(PID_FILE) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return
+
+        if not is_process_running(pid):
+            return
+
+        # Poll until it exits; a later reload rewrites the PID file
+        while is_process_running(pid):
+            time.sleep(1)
+
 def start_server(host='127.0.0.1', port=8000, debug=False):
     """Start the master server"""
     print(f"Starting CyberpunkMP Master Server on {host}:{port}")
@@ -35,11 +66,16 @@ def start_server(host='127.0.0.1', port=8000, debug=False):
     print("-" * 50)
 
     try:
-        cmd = [sys.executable, 'cyberpunkmp_master_server.py', '--host', host, '--port', str(port)]
+        cmd = [sys.executable, 'cyberpunkmp_master_server.py', '--host', host, '--port', str(port), '--pid-file', PID_FILE]
         if debug:
             cmd.append('--debug')
 
-        subprocess.run(cmd)
+        result = subprocess.run(cmd)
+
+        # A graceful reload (SIGHUP) hands the socket to a new process; keep
+        # running until that one stops too
+        if result.returncode == HANDOFF_EXIT_CODE:
+            wait_for_successor()
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e:
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Bulk ban import tests
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+from aiohttp.test_utils import TestServer, TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cyberpunkmp_master_server as master
+
+def ban_line(target):
+    return json.dumps({'type': 'player', 'target': target, 'reason': 'test'})
+
+class BanImportTest(unittest.IsolatedAsyncioTestCase):
+    """Streaming NDJSON ban imports"""
+
+    async def asyncSetUp(self):
+        # The master server keeps its database in the working directory
+        self.original_dir = os.getcwd()
+        self.work_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.work_dir.name)
+        self.server = master.CyberpunkMPMasterServer()
+        self.client = TestClient(TestServer(self.server.app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.db.close()
+        os.chdir(self.original_dir)
+        self.work_dir.cleanup()
+
+    async def test_overlong_line_is_reported_and_import_continues(self):
+        lines = [ban_line(f'p{i}') for i in range(master.BAN_IMPORT_BATCH_SIZE + 10)]
+        lines.insert(master.BAN_IMPORT_BATCH_SIZE + 5, 'x' * (master.BAN_IMPORT_MAX_LINE * 3))
+        lines.append('not json')
+
+        response = await self.client.post('/admin/bans/import', data='\n'.join(lines).encode())
+        self.assertEqual(response.status, 200)
+        result = await response.json()
+        self.assertEqual(result['imported'], master.BAN_IMPORT_BATCH_SIZE + 10)
+        self.assertEqual(result['skipped'], 2)
+        self.assertEqual([error['line'] for error in result['errors']],
+                         [master.BAN_IMPORT_BATCH_SIZE + 6, len(lines)])
+        self.assertIn('p0', self.server.banned_players)
+        self.assertIn(f'p{master.BAN_IMPORT_BATCH_SIZE + 9}', self.server.banned_players)
+
+    async def test_overlong_last_line_without_newline(self):
+        body = ban_line('p0') + '\n' + 'x' * (master.BAN_IMPORT_MAX_LINE + 1)
+        response = await self.client.post('/admin/bans/import', data=body.encode())
+        result = await response.json()
+        self.assertEqual((result['imported'], result['skipped']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Icon proxy tests against a local stand-in icon host
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer, TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cyberpunkmp_master_server as master
+
+def png(size, fill=b'x'):
+    """Build a fake PNG body of the given size"""
+    header = b'\x89PNG\r\n\x1a\n'
+    return header + fill * (size - len(header))
+
+class IconCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Fetching, serving and evicting cached icons"""
+
+    async def asyncSetUp(self):
+        # The master server keeps its database in the working directory
+        self.original_dir = os.getcwd()
+        self.work_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.work_dir.name)
+
+        self.icons = {
+            '/small.png': png(1000, b'a'),
+            '/other.png': png(1000, b'b'),
+            '/third.png': png(1000, b'c'),
+            '/huge.png': png(master.ICON_MAX_BYTES + 1)
+        }
+
+        async def handle_icon(request):
+            return web.Response(body=self.icons[request.path], content_type='image/png')
+
+        app = web.Application()
+        for path in self.icons:
+            app.router.add_get(path, handle_icon)
+        self.icon_host = TestServer(app, host='127.0.0.1')
+        await self.icon_host.start_server()
+
+    async def asyncTearDown(self):
+        await self.icon_host.close()
+        os.chdir(self.original_dir)
+        self.work_dir.cleanup()
+
+    def icon_url(self, path):
+        return str(self.icon_host.make_url(path))
+
+    async def test_announced_icon_is_served_with_etag(self):
+        cache = master.IconCache(allow_private_hosts=True)
+        server = master.CyberpunkMPMasterServer(icon_cache=cache)
+        client = TestClient(TestServer(server.app))
+        await client.start_server()
+
+        try:
+            response = await client.post('/announce', headers={'X-Forwarded-For': '8.8.8.8'}, data={
+                'name': 'Icon test', 'version': 'v0.1', 'port': '7777',
+                'player_count': '0', 'max_player_count': '8',
+                'icon_url': self.icon_url('/small.png')
+            })
+            self.assertEqual(response.status, 200)
+            await asyncio.gather(*cache.pending.values())
+
+            response = await client.get('/servers')
+            servers = (await response.json())['servers']
+            icon_url = servers[0]['icon_url']
+            self.assertTrue(icon_url.startswith(str(client.make_url('/icons/'))))
+            self.assertEqual(servers[0]['icon_source_url'], self.icon_url('/small.png'))
+
+            path = '/icons/' + icon_url.rsplit('/', 1)[1]
+            response = await client.get(path)
+            self.assertEqual(response.status, 200)
+            self.assertEqual(await response.read(), self.icons['/small.png'])
+            etag = response.headers['ETag']
+
+            response = await client.get(path, headers={'If-None-Match': etag})
+            self.assertEqual(response.status, 304)
+        finally:
+            await client.close()
+            await cache.close()
+            server.db.close()
+
+    async def test_private_hosts_are_refused_by_default(self):
+        cache = master.IconCache()
+        await cache.fetch(self.icon_url('/small.png'))
+        self.assertIsNone(cache.lookup(self.icon_url('/small.png')))
+        await cache.close()
+
+    async def test_oversized_icon_is_rejected(self):
+        cache = master.IconCache(allow_private_hosts=True)
+        await cache.fetch(self.icon_url('/huge.png'))
+        self.assertIsNone(cache.lookup(self.icon_url('/huge.png')))
+        self.assertEqual(cache.total_bytes, 0)
+        await cache.close()
+
+    async def test_least_recently_used_icon_is_evicted(self):
+        cache = master.IconCache(max_bytes=2500, allow_private_hosts=True)
+        evicted = []
+        cache.on_evicted = evicted.append
+
+        await cache.fetch(self.icon_url('/small.png'))
+        await cache.fetch(self.icon_url('/other.png'))
+        small_hash = cache.lookup(self.icon_url('/small.png'))
+        other_hash = cache.lookup(self.icon_url('/other.png'))
+        cache.touch(small_hash)
+
+        await cache.fetch(self.icon_url('/third.png'))
+        self.assertEqual(evicted, [other_hash])
+        self.assertIsNone(cache.lookup(self.icon_url('/other.png')))
+        self.assertIsNotNone(cache.lookup(self.icon_url('/small.png')))
+        self.assertLessEqual(cache.total_bytes, 2500)
+        self.assertFalse(os.path.exists(os.path.join(cache.cache_dir, f"{other_hash}.png")))
+        await cache.close()
+
+    async def test_index_is_written_on_close(self):
+        cache = master.IconCache(allow_private_hosts=True)
+        await cache.fetch(self.icon_url('/small.png'))
+        await cache.fetch(self.icon_url('/other.png'))
+        index_path = os.path.join(cache.cache_dir, 'index.json')
+        self.assertFalse(os.path.exists(index_path))  # Writes are batched
+
+        await cache.close()
+        reopened = master.IconCache()
+        self.assertEqual(reopened.lookup(self.icon_url('/small.png')), cache.lookup(self.icon_url('/small.png')))
+        self.assertEqual(len(reopened.urls), 2)
+
+    async def test_backlog_and_failures_are_bounded(self):
+        cache = master.IconCache()
+        stalled = asyncio.Event()
+
+        async def fetch(url):
+            await stalled.wait()
+        cache.fetch = fetch
+
+        for i in range(master.ICON_MAX_PENDING + 10):
+            cache.request(f'http://icons.example/{i}.png')
+        self.assertEqual(len(cache.pending), master.ICON_MAX_PENDING)
+        stalled.set()
+        await asyncio.gather(*cache.pending.values())
+
+        # Failed URLs back off, then age out of the table
+        cache.failed['http://icons.example/old.png'] = master.clock.time() - master.ICON_RETRY_AFTER
+        cache.failed['http://icons.example/new.png'] = master.clock.time()
+        cache.request('http://icons.example/new.png')
+        self.assertNotIn('http://icons.example/new.png', cache.pending)
+        self.assertNotIn('http://icons.example/old.png', cache.failed)
+        await cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
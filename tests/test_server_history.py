@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Run-length encoded server history tests
+"""
+
+import os
+import sys
+import itertools
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cyberpunkmp_master_server as master
+
+DAY_START = 1800000000 - 1800000000 % 86400  # A UTC midnight
+
+class ServerHistoryTest(unittest.TestCase):
+    """Writing heartbeat runs and merging them back into samples"""
+
+    def setUp(self):
+        # The master server keeps its database in the working directory
+        self.original_dir = os.getcwd()
+        self.work_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.work_dir.name)
+        self.server = master.CyberpunkMPMasterServer()
+
+    def tearDown(self):
+        self.server.db.close()
+        os.chdir(self.original_dir)
+        self.work_dir.cleanup()
+
+    def record(self, server_id, player_count, timestamp, status='online'):
+        self.server.record_history(self.server.db.cursor(), server_id, player_count, status, timestamp)
+
+    def rows(self):
+        return self.server.db.execute('''
+            SELECT server_id, timestamp, end_time, heartbeats, player_count, status
+            FROM server_history ORDER BY id
+        ''').fetchall()
+
+    def test_unchanged_heartbeats_extend_one_run(self):
+        for i in range(10):
+            self.record('a', 3, DAY_START + 100 + i * 60)
+        self.assertEqual(self.rows(), [('a', DAY_START + 100, DAY_START + 640, 10, 3, 'online')])
+
+    def test_changes_gaps_and_timeouts_start_new_runs(self):
+        self.record('a', 3, DAY_START + 100)
+        self.record('a', 4, DAY_START + 160)   # Player count changed
+        self.record('a', 4, DAY_START + 1160)  # Longer than the liveness window
+        self.record('a', 0, DAY_START + 1200, 'timeout')
+        self.record('a', 0, DAY_START + 1260)  # The timeout closed the run
+        self.assertEqual([row[3] for row in self.rows()], [1, 1, 1, 1, 1])
+
+    def test_runs_end_at_utc_midnight(self):
+        self.record('a', 3, DAY_START + 86400 - 30)
+        self.record('a', 3, DAY_START + 86400 + 30)
+        self.assertEqual([(row[1], row[3]) for row in self.rows()],
+                         [(DAY_START + 86400 - 30, 1), (DAY_START + 86400 + 30, 1)])
+
+    def make_run(self, server_id, start, end, heartbeats):
+        return (0, server_id, start, end, heartbeats, 1, 'online')
+
+    def test_merge_interleaves_overlapping_runs(self):
+        runs = [self.make_run('a', 0, 100, 5), self.make_run('b', 10, 90, 3), self.make_run('c', 200, 200, 1)]
+        samples = list(self.server.merge_history_runs(iter(runs)))
+        self.assertEqual([(t, r[1]) for t, r in samples],
+                         [(0, 'a'), (10, 'b'), (25, 'a'), (50, 'a'), (50, 'b'), (75, 'a'), (90, 'b'), (100, 'a'), (200, 'c')])
+
+        newest = sorted(runs, key=lambda r: r[3], reverse=True)
+        samples = list(self.server.merge_history_runs(iter(newest), descending=True))
+        self.assertEqual([t for t, _ in samples], [200, 100, 90, 75, 50, 50, 25, 10, 0])
+
+    def test_merge_clips_to_time_range(self):
+        runs = [self.make_run('a', 0, 100, 5), self.make_run('b', 10, 90, 3)]
+        samples = self.server.merge_history_runs(iter(runs), since=25, until=90)
+        self.assertEqual([t for t, _ in samples], [25, 50, 50, 75])
+
+    def test_merge_does_not_expand_whole_runs(self):
+        # A billion heartbeats would never fit in memory if expanded up front
+        runs = [self.make_run('a', 0, 10 ** 9 - 1, 10 ** 9)]
+        samples = self.server.merge_history_runs(iter(runs), descending=True, since=10 ** 9 - 3)
+        self.assertEqual([t for t, _ in samples], [10 ** 9 - 1, 10 ** 9 - 2, 10 ** 9 - 3])
+
+        samples = self.server.merge_history_runs(iter(runs), since=500)
+        self.assertEqual([t for t, _ in itertools.islice(samples, 3)], [500, 501, 502])
+
+if __name__ == '__main__':
+    unittest.main()